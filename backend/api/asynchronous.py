@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import QueryCounter, count_queries
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_WORKERS,
+    thread_name_prefix='async-read',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    if getattr(request, 'sql_queries', None) is None:
+        request.sql_queries = QueryCounter()
+    with count_queries(request.sql_queries):
+        response = view(request, *args, **kwargs)
+        # Render here rather than in the handler, which would do it on
+        # the shared thread-sensitive thread.
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+    return response
+
+
+def run_read_view(view, request, *args, **kwargs):
+    # Pool threads keep their own connections and get no request
+    # signals, so they apply CONN_MAX_AGE themselves.
+    close_old_connections()
+    try:
+        return run_view(view, request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Turn a synchronous view into an async one for ASGI serving.
+
+    Under ASGI Django runs synchronous views one at a time on a single
+    thread. Reads of the wrapped view run in a bounded pool of
+    ASYNC_READ_WORKERS threads instead, writes stay on the thread-sensitive
+    executor with the rest of the synchronous code.
+    """
+
+    # wraps() also copies csrf_exempt and the DRF attributes of the view;
+    # csrf_exempt() itself would turn the wrapper back into a sync view.
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            # Executors do not carry context variables over by themselves,
+            # the database router needs them.
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                read_executor, functools.partial(
+                    context.run, run_read_view, view, request, *args,
+                    **kwargs))
+        return await sync_to_async(run_view, thread_sensitive=True)(
+            view, request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,92 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from recipes.local_cache import LocalCache
+
+# Denormalized counters change without User.save(), so cached users leave
+# them deferred: they are read fresh when needed and never written back by
+# a save() of the cached instance.
+DEFERRED_USER_FIELDS = ('user__recipes_count', 'user__followers_count')
+
+
+class TokenUserCache:
+    """Per-process cache of token keys to (user, token) pairs.
+
+    Invalidations also leave a marker in the shared cache, checked on every
+    hit, so that other worker processes drop their copies as well.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self._cache = LocalCache(ttl, max_size)
+
+    def get(self, key):
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        user, token, cached_at = cached
+        revoked = cache.get_many([revoked_key('token', key),
+                                  revoked_key('user', user.pk)])
+        if any(revoked_at >= cached_at for revoked_at in revoked.values()):
+            self._cache.invalidate(key)
+            return None
+        # Requests may change their user, so they get their own copies.
+        return copy.copy(user), copy.copy(token)
+
+    def set(self, key, user, token):
+        self._cache.set(key, (copy.copy(user), copy.copy(token), time.time()))
+
+    def invalidate(self, key):
+        self._cache.invalidate(key)
+        self.revoke(revoked_key('token', key))
+
+    def invalidate_user(self, user_id):
+        self._cache.invalidate_where(lambda cached: cached[0].pk == user_id)
+        self.revoke(revoked_key('user', user_id))
+
+    def revoke(self, marker):
+        # After the commit, so that copies read before it are dropped too.
+        # Older copies are gone after `ttl`, and so is the marker.
+        transaction.on_commit(
+            lambda: cache.set(marker, time.time(), timeout=self.ttl))
+
+    def clear(self):
+        self._cache.clear()
+
+
+def revoked_key(kind, value):
+    return f'token-cache-revoked:{kind}:{value}'
+
+
+token_user_cache = TokenUserCache(ttl=settings.TOKEN_CACHE_TTL,
+                                  max_size=settings.TOKEN_CACHE_SIZE)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token query for cached keys."""
+
+    def authenticate_credentials(self, key):
+        cached = token_user_cache.get(key)
+        if cached is not None:
+            return cached
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').defer(
+                *DEFERRED_USER_FIELDS).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        token_user_cache.set(key, token.user, token)
+        return token.user, token
@@ -0,0 +1,72 @@
+import bisect
+
+from django.conf import settings
+
+from .replicas import use_primary
+from .serializers import IngredientRowSerializer
+from recipes.local_cache import LocalCache
+from recipes.models import Ingredient
+from recipes.search import normalize
+
+
+class IngredientIndex:
+    """Per-process index of ingredient names for autocomplete."""
+
+    def __init__(self, ttl):
+        self._cache = LocalCache(ttl)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def _build(self):
+        # Normalized names sorted next to ready to serialize rows: prefix
+        # matches are a binary search, substrings a scan of short strings.
+        with use_primary():
+            rows = sorted(
+                (normalize(item['name']), item['id'], item)
+                for item in IngredientRowSerializer(
+                    IngredientRowSerializer.get_rows(
+                        Ingredient.objects.all()),
+                    many=True,
+                ).data
+            )
+        keys = [key for key, _, _ in rows]
+        items = [item for _, _, item in rows]
+        return keys, items
+
+    def get_snapshot(self):
+        return self._cache.get('snapshot', self._build)
+
+    def all(self):
+        return self.get_snapshot()[1]
+
+    def search(self, query, limit):
+        """Return up to `limit` items, prefix matches before substrings."""
+        keys, items = self.get_snapshot()
+        query = normalize(query)
+        if not query:
+            return items[:limit]
+
+        found = []
+        position = bisect.bisect_left(keys, query)
+        while (position < len(keys) and len(found) < limit
+               and keys[position].startswith(query)):
+            found.append(items[position])
+            position += 1
+        if len(found) == limit:
+            return found
+
+        # Earlier occurrences rank higher, ties keep alphabetical order.
+        substring_matches = sorted(
+            (offset, index) for index, offset in (
+                (index, key.find(query)) for index, key in enumerate(keys)
+            ) if offset > 0
+        )
+        found.extend(
+            items[index] for _, index in
+            substring_matches[:limit - len(found)]
+        )
+        return found
+
+
+ingredient_index = IngredientIndex(ttl=settings.INGREDIENT_INDEX_TTL)
@@ -0,0 +1,156 @@
+import json
+import statistics
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+BASELINES_PATH = Path(__file__).resolve().parent / 'benchmark_baselines.json'
+
+Scenario = namedtuple('Scenario', ('name', 'path', 'authenticated', 'cold'),
+                      defaults=(False,))
+
+# Paths are formatted with the values returned by `scenario_context`.
+# Lists are paginated with ?limit like the frontend does. Cold scenarios
+# clear the cache before every request, so they measure how cached
+# responses are built rather than cache hits.
+SCENARIOS = (
+    Scenario('recipe_list', '/api/recipes/?limit=6', False),
+    Scenario('recipe_list_large_page', '/api/recipes/?limit=50', False),
+    Scenario('recipe_list_authenticated', '/api/recipes/?limit=50', True),
+    Scenario('recipe_list_cursor',
+             '/api/recipes/?paginate=cursor&limit=6', True),
+    Scenario('recipe_detail', '/api/recipes/{recipe}/', False),
+    Scenario('recipe_detail_authenticated', '/api/recipes/{recipe}/', True),
+    Scenario('recipe_list_cold', '/api/recipes/?limit=6', False, True),
+    Scenario('recipe_list_authenticated_cold', '/api/recipes/?limit=50',
+             True, True),
+    Scenario('recipe_detail_cold', '/api/recipes/{recipe}/', False, True),
+    Scenario('tag_list_cold', '/api/tags/', False, True),
+    Scenario('recipe_list_by_tags',
+             '/api/recipes/?limit=6&tags={tags[0]}&tags={tags[1]}', True),
+    Scenario('recipe_list_favorited',
+             '/api/recipes/?limit=6&is_favorited=1', True),
+    Scenario('recipe_list_in_cart',
+             '/api/recipes/?limit=6&is_in_shopping_cart=1', True),
+    Scenario('recipe_search', '/api/recipes/?limit=6&search={word}', False),
+    Scenario('recipe_by_ingredients',
+             '/api/recipes/?limit=6&ingredients={ingredients}', False),
+    Scenario('recipe_feed', '/api/recipes/feed/?limit=6', True),
+    Scenario('subscriptions', '/api/users/subscriptions/?limit=6', True),
+    Scenario('shopping_list', '/api/recipes/shopping_list/', True),
+    Scenario('shopping_cart_download',
+             '/api/recipes/download_shopping_cart/', True),
+    Scenario('shopping_cart_download_csv',
+             '/api/recipes/download_shopping_cart/?filetype=csv', True),
+    Scenario('ingredient_search', '/api/ingredients/?name={prefix}', False),
+    Scenario('tag_list', '/api/tags/', False),
+)
+
+
+def scenario_context():
+    """Pick deterministic objects of the generated data for the paths."""
+    recipe = Recipe.objects.order_by('id').first()
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe=recipe).order_by('id').values_list(
+        'ingredient_id', 'ingredient__name')
+    return {
+        'recipe': recipe.id,
+        'tags': list(Tag.objects.order_by('id').values_list(
+            'slug', flat=True)[:2]),
+        'word': recipe.name.split()[0],
+        'ingredients': ','.join(str(id) for id, _ in ingredients),
+        'prefix': ingredients[0][1][:2],
+    }
+
+
+def read_response(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def run_scenario(client, path, repeat, cold=False):
+    """Return the query count and the median wall time in milliseconds.
+
+    The first request warms up caches and in-memory indexes and is not
+    measured. With `cold` the cache is cleared before every request.
+    """
+    read_response(client.get(path))
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            read_response(response)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} answered {response.status_code}')
+    return len(queries), statistics.median(timings)
+
+
+def run_benchmarks(user, repeat, names=None):
+    context = scenario_context()
+    anonymous, authenticated = APIClient(), APIClient()
+    authenticated.force_authenticate(user)
+    results = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        client = authenticated if scenario.authenticated else anonymous
+        queries, time_ms = run_scenario(
+            client, scenario.path.format(**context), repeat, scenario.cold)
+        results[scenario.name] = {'queries': queries,
+                                  'time_ms': round(time_ms, 2)}
+    return results
+
+
+def compare(results, baselines, time_tolerance):
+    """List regressions of the results against the stored baselines.
+
+    Query counts must not grow at all, wall time may grow up to
+    `time_tolerance` times to absorb the noise of shared machines.
+    Times are only comparable when the baselines were recorded at the same
+    scale, so pass `time_tolerance=None` otherwise.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if result['queries'] > baseline['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} queries, '
+                f'baseline {baseline["queries"]}')
+        if (time_tolerance is not None
+                and result['time_ms'] > baseline['time_ms'] * time_tolerance):
+            regressions.append(
+                f'{name}: {result["time_ms"]} ms, '
+                f'baseline {baseline["time_ms"]} ms')
+    return regressions
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, encoding='utf-8') as stream:
+            return json.load(stream)
+    except FileNotFoundError:
+        return {'scale': None, 'scenarios': {}}
+
+
+def save_baselines(scale, seed, results, path=BASELINES_PATH):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump({'scale': scale, 'seed': seed, 'scenarios': results},
+                  stream, indent=4, sort_keys=True)
+        stream.write('\n')
@@ -0,0 +1,251 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, Max, OuterRef
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, urlencode
+from rest_framework.response import Response
+
+from .replicas import use_primary
+from .serializers import RecipeRowSerializer, get_subscribed_ids
+from recipes.models import Favourite, Recipe, ShoppingCart
+
+
+def get_version(namespace, timeout=None):
+    return cache.get_or_set(f'{namespace}:version', time.time_ns(),
+                            timeout=timeout)
+
+
+def bump_version(namespace):
+    """Invalidate every cached response of the namespace."""
+    try:
+        cache.incr(f'{namespace}:version')
+    except ValueError:
+        # The counter was evicted; restart it from a value that cannot
+        # collide with the keys of responses cached before the eviction.
+        cache.set(f'{namespace}:version', time.time_ns(), timeout=None)
+
+
+def get_versions(namespaces):
+    """Return the versions of many namespaces in one cache round trip."""
+    keys = {namespace: f'{namespace}:version' for namespace in namespaces}
+    versions = cache.get_many(keys.values())
+    missing = {key: time.time_ns() for key in keys.values()
+               if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {namespace: versions[key] for namespace, key in keys.items()}
+
+
+def reset_versions(namespaces):
+    """Invalidate many namespaces at once.
+
+    Versions restart from the clock, so they cannot collide with the keys
+    cached before the reset.
+    """
+    cache.delete_many([f'{namespace}:version' for namespace in namespaces])
+
+
+def recipe_namespace(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def relations_namespace(user_id):
+    return f'relations:{user_id}'
+
+
+class CachedListMixin:
+    """Serve `list` from a pre-rendered payload with a strong ETag.
+
+    Cached payloads are keyed by the namespace version, so bumping the
+    version from model signals makes every stale entry unreachable.
+    """
+
+    cache_namespace = None
+
+    def get_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return (f'{self.cache_namespace}:{get_version(self.cache_namespace)}'
+                f':{hashlib.md5(query.encode()).hexdigest()}')
+
+    def get_list_data(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_serializer(queryset, many=True).data
+
+    def get_json_renderer(self):
+        return next(renderer for renderer in self.get_renderers()
+                    if renderer.format == 'json')
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            with use_primary():
+                data = self.get_list_data(request)
+            payload = self.get_json_renderer().render(data)
+            cached = (payload, f'"{hashlib.md5(payload).hexdigest()}"')
+            cache.set(key, cached, timeout=settings.API_CACHE_TIMEOUT)
+        payload, etag = cached
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(payload, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class CachedRecipeMixin:
+    """Serve recipes from cached representations shared by all viewers.
+
+    Only `is_favorited`, `is_in_shopping_cart` and `author.is_subscribed`
+    depend on the viewer: they are overlaid on the cached data with one
+    query for the page. Keys contain the `updated` timestamp of the recipe,
+    so changes made through other processes are picked up as well. Every
+    recipe also has its own cache version, reset by api.signals when the
+    recipe, its tags, ingredients, images or author change; the `recipes`
+    version invalidates all of them at once.
+    """
+
+    def get_recipe_cache_keys(self, recipes):
+        versions = get_versions(
+            ['recipes', *map(recipe_namespace, recipes)])
+        # Image URLs are absolute, so they depend on the requested host.
+        origin = hashlib.md5(
+            self.request.build_absolute_uri('/').encode()).hexdigest()
+        return {
+            recipe_id: (f'recipe:{recipe_id}:{updated.timestamp()}:'
+                        f'{versions["recipes"]}:'
+                        f'{versions[recipe_namespace(recipe_id)]}:{origin}')
+            for recipe_id, updated in recipes.items()
+        }
+
+    def get_shared_recipes(self, recipes):
+        """Return representations of the existing recipes, in order.
+
+        `recipes` maps the ids of the recipes to their `updated`.
+        """
+        keys = self.get_recipe_cache_keys(recipes)
+        cached = cache.get_many(keys.values())
+        data = {recipe_id: cached[key] for recipe_id, key in keys.items()
+                if key in cached}
+        missing = [recipe_id for recipe_id in recipes
+                   if recipe_id not in data]
+        if missing:
+            with use_primary():
+                rows = RecipeRowSerializer.get_rows(missing)
+            fresh = {
+                item['id']: item for item in RecipeRowSerializer(
+                    rows, many=True, context=self.get_serializer_context(),
+                ).data
+            }
+            cache.set_many({keys[recipe_id]: item
+                            for recipe_id, item in fresh.items()},
+                           timeout=settings.API_CACHE_TIMEOUT)
+            data.update(fresh)
+        return [data[recipe_id] for recipe_id in recipes
+                if recipe_id in data]
+
+    def overlay_user_flags(self, items):
+        user = self.request.user
+        if user.is_anonymous or not items:
+            return items
+        flags = {
+            recipe_id: (is_favorited, is_in_shopping_cart)
+            for recipe_id, is_favorited, is_in_shopping_cart
+            in Recipe.objects.filter(
+                id__in=[item['id'] for item in items]
+            ).annotate(
+                is_favorited=Exists(Favourite.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+            ).values_list('id', 'is_favorited', 'is_in_shopping_cart')
+        }
+        subscribed = get_subscribed_ids(self.request)
+        for item in items:
+            item['is_favorited'], item['is_in_shopping_cart'] = flags.get(
+                item['id'], (False, False))
+            author = item['author']
+            if author is not None:
+                author['is_subscribed'] = (author['id'] != user.id
+                                           and author['id'] in subscribed)
+        return items
+
+    def list_recipes(self, queryset):
+        """Paginate the ids of the queryset and respond with the recipes."""
+        queryset = queryset.values('id', 'updated')
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        data = self.overlay_user_flags(self.get_shared_recipes(
+            {row['id']: row['updated'] for row in rows}))
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def get_validators(self, queryset):
+        """Return the state, ETag and Last-Modified of the recipes.
+
+        Any change of a recipe bumps its `updated`, and a recipe leaving
+        the queryset lowers the count unless a newer one took its place,
+        so one aggregate query covers the shared data. The viewer's flags
+        are covered by the version of their relations; Last-Modified
+        cannot express it and is only sent to anonymous viewers.
+        """
+        state = queryset.aggregate(count=Count('id'),
+                                   updated=Max('updated'))
+        updated = state['updated'] and state['updated'].timestamp()
+        parts = [self.request.build_absolute_uri(), state['count'], updated]
+        user = self.request.user
+        if user.is_anonymous:
+            last_modified = updated and int(updated)
+        else:
+            # Expires like cached responses, for processes that did not
+            # see the change.
+            parts += [user.pk, get_version(relations_namespace(user.pk),
+                                           settings.API_CACHE_TIMEOUT)]
+            last_modified = None
+        etag = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+        return state, f'"{etag}"', last_modified
+
+    def conditional_response(self, queryset, respond, allow_empty=True):
+        """Answer 304 before serializing anything if the client is fresh."""
+        state, etag, last_modified = self.get_validators(queryset)
+        if not state['count'] and not allow_empty:
+            raise Http404
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond(state)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.queryset.model.objects.all())
+        if 'ordering' in request.query_params:
+            # Pages ordered by counters change without touching recipes.
+            return self.list_recipes(queryset)
+        return self.conditional_response(
+            queryset, lambda state: self.list_recipes(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            recipe_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+
+        def respond(state):
+            items = self.get_shared_recipes({recipe_id: state['updated']})
+            if not items:
+                raise Http404
+            return Response(self.overlay_user_flags(items)[0])
+
+        return self.conditional_response(
+            self.queryset.model.objects.filter(pk=recipe_id), respond,
+            allow_empty=False)
@@ -1,17 +1,62 @@
 import django_filters
 from django.contrib.auth import get_user_model
+from django.db.models import Case, IntegerField, Value, When
+from django_filters.constants import EMPTY_VALUES
 
-from recipes.models import Recipe, Ingredient
+from constraints.constraints import max_missing_ingredients
+from recipes.ingredient_index import ingredient_recipe_index
+from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
 
 User = get_user_model()
 
 
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class StableOrderingFilter(django_filters.OrderingFilter):
+    """OrderingFilter that breaks ties by id, so that pages are stable."""
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return qs.order_by(
+            *(self.get_ordering_value(param) for param in value), '-id')
+
+
 class TagsInRecipeFilter(django_filters.FilterSet):
-    tags = django_filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = django_filters.ModelMultipleChoiceFilter(
+        field_name='tags__slug', to_field_name='slug',
+        queryset=Tag.objects.all())
     is_favorited = django_filters.NumberFilter(method='filter_is_favorited')
     author = django_filters.NumberFilter(method='filter_author')
     is_in_shopping_cart = django_filters.NumberFilter(
         method='filter_is_in_shopping_cart')
+    search = django_filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    ordering = StableOrderingFilter(
+        fields=('favorites_count', 'carts_count'))
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        groups = ingredient_recipe_index.match(
+            [int(ingredient_id) for ingredient_id in value],
+            max_missing_ingredients,
+        )
+        if not any(groups):
+            return queryset.none()
+        missing = Case(
+            *(When(id__in=recipe_ids, then=Value(count))
+              for count, recipe_ids in enumerate(groups) if recipe_ids),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(
+            id__in=[recipe_id for group in groups for recipe_id in group]
+        ).annotate(missing_ingredients=missing).order_by(
+            'missing_ingredients', '-id')
 
     def filter_author(self, queryset, name, value):
         return queryset.filter(author_id=value)
@@ -36,12 +81,3 @@ class TagsInRecipeFilter(django_filters.FilterSet):
     class Meta:
         model = Recipe
         fields = ['tags', 'author']
-
-
-class IngredientFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(field_name='name',
-                                     lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ['name']
@@ -0,0 +1,74 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from api.benchmarks import (SCENARIOS, compare, load_baselines,
+                            run_benchmarks, save_baselines)
+from recipes.management.commands.generate_data import USERNAME_PREFIX
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Measure query counts and wall time of the main endpoints on '
+            'generated data in a throwaway test database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--scenario', action='append',
+                            choices=[scenario.name for scenario in SCENARIOS],
+                            help='Run only the given scenarios.')
+        parser.add_argument('--time-tolerance', type=float, default=2.0,
+                            help='Allowed slowdown against the baseline.')
+        parser.add_argument('--no-time', action='store_true',
+                            help='Compare query counts only.')
+        parser.add_argument('--update-baselines', action='store_true')
+
+    def handle(self, *args, scale, seed, repeat, **options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root):
+                call_command('generate_data', scale=scale, seed=seed,
+                             stdout=StringIO())
+                results = run_benchmarks(
+                    User.objects.get(username=f'{USERNAME_PREFIX}0'),
+                    repeat, options['scenario'])
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        baselines = load_baselines()
+        stored = baselines['scenarios']
+        for name, result in results.items():
+            baseline = stored.get(name, {})
+            self.stdout.write(
+                f'{name:<32}{result["queries"]:>4} queries '
+                f'({baseline.get("queries", "-")}) '
+                f'{result["time_ms"]:>9.2f} ms '
+                f'({baseline.get("time_ms", "-")})')
+
+        if options['update_baselines']:
+            if options['scenario']:
+                results = {**stored, **results}
+            save_baselines(scale, seed, results)
+            self.stdout.write(self.style.SUCCESS('Baselines updated.'))
+            return
+
+        time_tolerance = options['time_tolerance']
+        if options['no_time'] or baselines['scale'] != scale:
+            time_tolerance = None
+        regressions = compare(results, stored, time_tolerance)
+        if regressions:
+            raise CommandError('Regressions against the baselines:\n'
+                               + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
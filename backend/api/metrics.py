@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from prometheus_client import (REGISTRY, CollectorRegistry, Histogram,
+                               generate_latest, multiprocess)
+
+LABELS = ('route', 'method')
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Time spent handling a request.',
+    LABELS,
+)
+SQL_QUERIES = Histogram(
+    'foodgram_request_sql_queries',
+    'SQL queries executed per request.',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf')),
+)
+SQL_DURATION = Histogram(
+    'foodgram_request_sql_duration_seconds',
+    'Time spent in SQL queries per request.',
+    LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Size of response bodies.',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+             float('inf')),
+)
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries and their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries(queries):
+    """Count queries made through the connections of the current thread."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            if queries not in connection.execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(queries))
+        yield queries
+
+
+class MetricsMiddleware:
+    """Record latency, SQL usage and response size per route and method.
+
+    Under ASGI the views run in other threads than the middleware, so SQL
+    usage is only recorded for views that count it themselves and store the
+    counter as `request.sql_queries` (see api.asynchronous).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Same marker as Django's MiddlewareMixin uses to be treated
+            # as a coroutine function by the handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        request.sql_queries = QueryCounter()
+        start = time.perf_counter()
+        with count_queries(request.sql_queries):
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration):
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unresolved', request.method)
+        REQUEST_DURATION.labels(*labels).observe(duration)
+        queries = getattr(request, 'sql_queries', None)
+        if queries is not None:
+            SQL_QUERIES.labels(*labels).observe(queries.count)
+            SQL_DURATION.labels(*labels).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+
+
+def render_metrics():
+    """Render metrics of this process, or of all workers in multiprocess
+    mode (PROMETHEUS_MULTIPROC_DIR set), in Prometheus text format."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
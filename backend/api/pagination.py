@@ -1,5 +1,44 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "-id"
 
 
 class Pagination(PageNumberPagination):
+    """Page number pagination with an opt-in keyset (cursor) mode.
+
+    ?paginate=cursor, or a cursor from a previous `next` link, switches
+    to KeysetPagination: pages are ordered by primary key and fetched with
+    an indexed range condition, without OFFSET and without COUNT(*).
+    Querysets ordered otherwise, e.g. ranked by ?search= or ?ingredients=
+    or sorted by ?ordering=, are rejected rather than silently reordered.
+    """
+
     page_size_query_param = "limit"
+    mode_query_param = "paginate"
+
+    keyset = None
+
+    def use_keyset(self, request):
+        return (request.query_params.get(self.mode_query_param) == "cursor"
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            order_by = tuple(queryset.query.order_by)
+            if order_by and order_by != (KeysetPagination.ordering,):
+                raise ValidationError({self.mode_query_param: (
+                    'Cursor pagination is only available for results in '
+                    'the default order.')})
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
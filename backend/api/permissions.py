@@ -21,3 +21,11 @@ class IsAuthorOrAdminOrReadOnly(BasePermission):
             return True
 
         return obj.author == request.user or request.user.is_staff
+
+
+class IsAdminOrLocalRequest(BasePermission):
+    LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+    def has_permission(self, request, view):
+        return (request.user.is_staff
+                or request.META.get('REMOTE_ADDR') in self.LOCAL_ADDRESSES)
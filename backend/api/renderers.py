@@ -0,0 +1,27 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same compact UTF-8 output with orjson.
+
+    Values orjson does not handle natively, datetimes included, go through
+    DRF's encoder, so they are formatted as before. Indented output is left
+    to the standard renderer.
+    """
+
+    fallback_encoder = JSONEncoder()
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        ret = orjson.dumps(data, default=self.fallback_encoder.default,
+                           option=self.options)
+        # Escaped by JSONRenderer too, as they are invalid in JavaScript.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
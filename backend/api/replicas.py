@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authtoken.models import Token
+
+API_PREFIX = '/api/'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Whether reads of the current request may go to a replica. Unset outside
+# of requests, so management commands and background threads read from
+# the primary.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary, e.g. to fill caches shared by all clients.
+
+    Such reads must not come from a lagging replica: the stale data would
+    be cached under the versions bumped by the write it lags behind.
+    """
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads of safe-method API requests to DATABASE_REPLICAS.
+
+    Everything else, including every write, uses the primary. Tokens are
+    always read from the primary, so that a client can use its token right
+    after logging in.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (settings.DATABASE_REPLICAS and replica_reads.get()
+                and model is not Token):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+def get_pin_key(request):
+    client = (request.headers.get('Authorization')
+              or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if client:
+        return f'replica-pin:{hashlib.md5(client.encode()).hexdigest()}'
+    return None
+
+
+def routes_reads(request):
+    return (bool(settings.DATABASE_REPLICAS)
+            and request.path_info.startswith(API_PREFIX))
+
+
+def pin(key):
+    if key is not None:
+        cache.set(key, True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(key):
+    return key is not None and bool(cache.get(key))
+
+
+class ReplicaMiddleware:
+    """Route API reads to replicas, except for clients that just wrote.
+
+    After a write the client is pinned to the primary for
+    REPLICA_PIN_SECONDS, so that it sees its own changes even if the
+    replicas lag behind. Clients are told apart by their token or session,
+    so the pins need a cache shared by all workers.
+
+    Async capable, so that under ASGI it does not hold the thread-sensitive
+    thread for the whole request (see api.asynchronous).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # See api.metrics.MetricsMiddleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not routes_reads(request):
+            return self.get_response(request)
+
+        key = get_pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            pin(key)
+            return response
+
+        token = replica_reads.set(not is_pinned(key))
+        try:
+            return self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        if not routes_reads(request):
+            return await self.get_response(request)
+
+        key = get_pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            await sync_to_async(pin, thread_sensitive=False)(key)
+            return response
+
+        pinned = await sync_to_async(is_pinned, thread_sensitive=False)(key)
+        token = replica_reads.set(not pinned)
+        try:
+            return await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
@@ -1,20 +1,51 @@
 import base64
 
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
-from rest_framework.serializers import ImageField, ModelSerializer
+from rest_framework.serializers import (BaseSerializer, ImageField,
+                                        IntegerField, ListField,
+                                        ModelSerializer, ReadOnlyField,
+                                        Serializer)
 
+from constraints.constraints import (default_recipes_limit, max_bulk_recipes,
+                                     max_recipes_limit)
 from users.models import Subscription
-from recipes.models import Ingredient, Recipe, Tag, IngredientInRecipe
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingListItem, Tag)
+from recipes.signals import ingredients_changed
 
 User = get_user_model()
 
 
+def get_subscribed_ids(request):
+    """Return ids of authors followed by the current user.
+
+    The set is loaded once and kept on the request, so every nested
+    UserSerializer rendered during the request shares a single query.
+    """
+    if not hasattr(request, 'subscribed_ids'):
+        request.subscribed_ids = set(
+            Subscription.objects.filter(user=request.user)
+            .values_list('author_id', flat=True)
+        )
+    return request.subscribed_ids
+
+
+def get_recipes_limit(request):
+    """Return the number of recipes to embed per subscribed author."""
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    if not recipes_limit.isdigit():
+        return default_recipes_limit
+    return min(int(recipes_limit), max_recipes_limit)
+
+
 class IngredientSerializer(ModelSerializer):
     class Meta:
         model = Ingredient
@@ -27,6 +58,31 @@ class TagSerializer(ModelSerializer):
         fields = '__all__'
 
 
+class RowSerializer(BaseSerializer):
+    """Read-only serializer of `values()` rows holding `row_fields`.
+
+    Skips per-field to_representation() of model serializers on hot list
+    endpoints; the output must stay identical to the model serializer's.
+    """
+
+    row_fields = ()
+
+    @classmethod
+    def get_rows(cls, queryset):
+        return queryset.values(*cls.row_fields)
+
+    def to_representation(self, row):
+        return {field: row[field] for field in self.row_fields}
+
+
+class TagRowSerializer(RowSerializer):
+    row_fields = ('id', 'name', 'color', 'slug')
+
+
+class IngredientRowSerializer(RowSerializer):
+    row_fields = ('id', 'name', 'measurement_unit')
+
+
 class UserSerializer(UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
@@ -42,11 +98,14 @@ class UserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        user = request.user
         if user.is_authenticated:
             if user.id == obj.id:
                 return False
-            return Subscription.objects.filter(user=user, author=obj).exists()
+            return obj.id in get_subscribed_ids(request)
         else:
             return False
 
@@ -77,11 +136,39 @@ class Base64ImageField(ImageField):
         return super().to_internal_value(data)
 
 
-class RecipeSerializer(ModelSerializer):
+def get_file_url(name, request):
+    """Return the URL of a stored file the way DRF file fields do."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_image_variant_urls(image, variants, request):
+    if not image or variants.get('source') != image:
+        return None
+    urls = {
+        key: get_file_url(name, request) for key, name in variants.items()
+        if key not in ('source', 'placeholder')
+    }
+    urls['placeholder'] = variants['placeholder']
+    return urls
+
+
+class ImageVariantsMixin:
+    """Expose URLs of resized recipe images once they have been built."""
+
+    def get_image_variants(self, obj):
+        return get_image_variant_urls(obj.image.name, obj.image_variants,
+                                      self.context.get('request'))
+
+
+class RecipeSerializer(ImageVariantsMixin, ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = SerializerMethodField()
     image = Base64ImageField()
+    image_variants = SerializerMethodField()
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -96,6 +183,7 @@ class RecipeSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
@@ -111,8 +199,7 @@ class RecipeSerializer(ModelSerializer):
         if len(tags_data) != len(set(tags_data)):
             raise ValidationError({'tags': 'Tags must be unique.'})
 
-        if not all(Tag.objects.filter(id=tag_id).exists()
-                   for tag_id in tags_data):
+        if Tag.objects.filter(id__in=tags_data).count() != len(tags_data):
             raise ValidationError({'tags': 'One or more tags do not exist.'})
 
         if not ingredients_data:
@@ -158,39 +245,41 @@ class RecipeSerializer(ModelSerializer):
         return ingredients_data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.favourite_related.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.shoppingcart_related.filter(recipe=obj).exists()
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = self.context['request'].data.get('tags')
         ingredients_data = self.context['request'].data.get('ingredients', [])
 
         recipe = Recipe.objects.create(**validated_data)
-
-        if tags_data:
-            tags = Tag.objects.filter(id__in=tags_data)
-            recipe.tags.set(tags)
-
-        if ingredients_data:
-            for ingredient_data in ingredients_data:
-                ingredient_id = ingredient_data.get('id')
-                amount = ingredient_data.get('amount')
-                ingredient = get_object_or_404(Ingredient, id=ingredient_id)
-                IngredientInRecipe.objects.create(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=amount
-                )
-
-        recipe.save()
+        recipe.tags.set(tags_data)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_data['id'],
+                amount=ingredient_data['amount'],
+            )
+            for ingredient_data in ingredients_data
+        )
+        ingredients_changed.send(sender=Recipe, recipe_ids=[recipe.id])
+        prefetch_related_objects([recipe], Prefetch(
+            'ingredient_list',
+            queryset=IngredientInRecipe.objects.select_related('ingredient'),
+        ))
         return recipe
 
 
@@ -220,24 +309,22 @@ class SubscriptionSerializer(UserSerializer):
         return data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipe_limit = request.GET.get('recipes_limit')
-
-        if recipe_limit and recipe_limit.isdigit():
-            recipe_limit = int(recipe_limit)
-            recipes = obj.recipes.all()[:recipe_limit]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
         else:
-            recipes = obj.recipes.all()
+            request = self.context.get('request')
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
 
         serializer = RecipeForSubSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
 
-class RecipeForSubSerializer(ModelSerializer):
+class RecipeForSubSerializer(ImageVariantsMixin, ModelSerializer):
     image = Base64ImageField()
+    image_variants = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -245,5 +332,86 @@ class RecipeForSubSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
+
+
+class RecipeIdsSerializer(Serializer):
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=max_bulk_recipes,
+    )
+
+
+class ShoppingListItemSerializer(ModelSerializer):
+    id = ReadOnlyField(source='ingredient.id')
+    name = ReadOnlyField(source='ingredient.name')
+    measurement_unit = ReadOnlyField(source='ingredient.measurement_unit')
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class RecipeRowSerializer(BaseSerializer):
+    """Read-only RecipeSerializer for rows loaded by `get_rows`.
+
+    Renders the part of a recipe shared by all viewers: the per-user
+    flags are False and are overlaid by CachedRecipeMixin.
+    """
+
+    @staticmethod
+    def get_rows(recipe_ids):
+        """Load recipes with their tags and ingredients in three queries."""
+        recipes = {
+            row['id']: dict(row, tags=[], ingredients=[])
+            for row in Recipe.objects.filter(id__in=recipe_ids).values(
+                'id', 'name', 'image', 'image_variants', 'text',
+                'cooking_time', 'author__email', 'author__id',
+                'author__username', 'author__first_name',
+                'author__last_name')
+        }
+        for recipe_id, *tag in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipes
+        ).order_by('tag_id').values_list(
+            'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+        ):
+            recipes[recipe_id]['tags'].append(
+                dict(zip(TagRowSerializer.row_fields, tag)))
+        for recipe_id, *ingredient in IngredientInRecipe.objects.filter(
+            recipe_id__in=recipes
+        ).order_by('id').values_list(
+            'recipe_id', 'ingredient__id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        ):
+            recipes[recipe_id]['ingredients'].append(dict(zip(
+                (*IngredientRowSerializer.row_fields, 'amount'),
+                ingredient)))
+        return [recipes[recipe_id] for recipe_id in recipe_ids
+                if recipe_id in recipes]
+
+    def to_representation(self, row):
+        request = self.context.get('request')
+        return {
+            'id': row['id'],
+            'tags': row['tags'],
+            'author': None if row['author__id'] is None else {
+                'email': row['author__email'],
+                'id': row['author__id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': False,
+            },
+            'ingredients': row['ingredients'],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': get_file_url(row['image'], request),
+            'image_variants': get_image_variant_urls(
+                row['image'], row['image_variants'], request),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
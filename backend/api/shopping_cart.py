@@ -0,0 +1,32 @@
+import csv
+
+SHOPPING_CART_FILETYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """File-like object that returns written value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def render_txt(ingredients):
+    yield 'Shopping list:\n\n'
+    for name, unit, amount in ingredients:
+        yield f'{name} - {amount} {unit}\n'
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for name, unit, amount in ingredients:
+        yield writer.writerow((name, amount, unit))
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+}
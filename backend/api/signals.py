@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_user_cache
+from .autocomplete import ingredient_index
+from .caching import (bump_version, recipe_namespace, relations_namespace,
+                      reset_versions)
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.signals import (image_variants_built, ingredients_changed,
+                             ingredients_imported, relations_added)
+from users.models import Subscription
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver(ingredients_imported)
+def invalidate_ingredients(sender, **kwargs):
+    ingredient_index.invalidate()
+    bump_version('ingredients')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    bump_version('tags')
+    bump_version('recipes')
+
+
+def invalidate_recipes(recipe_ids):
+    namespaces = [recipe_namespace(recipe_id) for recipe_id in recipe_ids]
+    # After the commit, so that concurrent readers cannot cache the old
+    # rows under the new versions.
+    transaction.on_commit(lambda: reset_versions(namespaces))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_version('recipes')
+    else:
+        invalidate_recipes([instance.pk])
+
+
+@receiver(ingredients_changed)
+@receiver(image_variants_built)
+def invalidate_recipe_contents(sender, recipe_ids, **kwargs):
+    invalidate_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_author_recipes(sender, instance, created, update_fields=None,
+                              **kwargs):
+    if created or (update_fields is not None
+                   and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_recipes(list(Recipe.objects.filter(
+        author=instance).values_list('id', flat=True)))
+
+
+def invalidate_relations(user_ids):
+    # Part of the ETags of recipes, whose flags depend on the viewer.
+    namespaces = [relations_namespace(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: reset_versions(namespaces))
+
+
+@receiver([post_save, post_delete], sender=Favourite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_user_relations(sender, instance, **kwargs):
+    invalidate_relations([instance.user_id])
+
+
+@receiver(relations_added)
+def invalidate_added_relations(sender, user_ids, **kwargs):
+    invalidate_relations(user_ids)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_user_cache.invalidate(instance.key)
+
+
+# Password changes and deactivation are saved through User.save().
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    token_user_cache.invalidate_user(instance.pk)
@@ -0,0 +1,631 @@
+import asyncio
+import datetime
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .asynchronous import async_read_view
+from .authentication import (CachedTokenAuthentication, TokenUserCache,
+                             token_user_cache)
+from .renderers import ORJSONRenderer
+from .replicas import get_pin_key, replica_reads
+from .serializers import (IngredientRowSerializer, IngredientSerializer,
+                          RecipeRowSerializer, RecipeSerializer,
+                          TagRowSerializer, TagSerializer)
+from .views import RecipeViewSet
+
+from recipes.counters import COUNTERS, reconcile
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscription
+
+User = get_user_model()
+
+SLOW_VIEW_SECONDS = 0.3
+
+
+def slow_view(request):
+    time.sleep(SLOW_VIEW_SECONDS)
+    return HttpResponse(str(replica_reads.get()))
+
+
+# Used as ROOT_URLCONF by AsyncReadTest.
+urlpatterns = [path('api/slow/', async_read_view(slow_view))]
+
+
+class RecipeDataTestCase(TestCase):
+    """Users following each other, tagged recipes with ingredients."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}', password='Pa55word!x',
+                first_name='Имя', last_name='Фамилия')
+            for number in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('абрикосы', 'ежевика', 'мука', 'сахар', 'соль')
+        ]
+        cls.recipes = []
+        for number in range(12):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', author=cls.users[number % 2],
+                image='recipes/images/recipe.png', text='Описание',
+                cooking_time=number + 1)
+            recipe.tags.set(cls.tags[number % 3:])
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                                   amount=10 * position + number)
+                for position, ingredient in enumerate(
+                    cls.ingredients[:2 + number % 4], 1))
+            cls.recipes.append(recipe)
+        Subscription.objects.create(user=cls.users[2], author=cls.users[0])
+        Favourite.objects.create(user=cls.users[2], recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.users[2], recipe=cls.recipes[1])
+
+    def setUp(self):
+        # Responses are cached across tests otherwise.
+        cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[2])
+
+
+class RecipeQueryBudgetTest(RecipeDataTestCase):
+    """Recipe endpoints make a fixed number of queries per request."""
+
+    def assert_queries(self, client, path, count):
+        with self.assertNumQueries(count):
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        for limit in (1, 6, 12):
+            cache.clear()
+            with self.subTest(limit=limit):
+                response = self.assert_queries(
+                    self.anonymous, f'/api/recipes/?limit={limit}', 6)
+                self.assertEqual(len(response.data['results']), limit)
+                self.assert_queries(
+                    self.anonymous, f'/api/recipes/?limit={limit}', 3)
+
+    def test_list_authenticated(self):
+        for limit in (1, 6, 12):
+            cache.clear()
+            with self.subTest(limit=limit):
+                self.assert_queries(
+                    self.client, f'/api/recipes/?limit={limit}', 8)
+                self.assert_queries(
+                    self.client, f'/api/recipes/?limit={limit}', 5)
+
+    def test_detail(self):
+        path = f'/api/recipes/{self.recipes[0].id}/'
+        self.assert_queries(self.anonymous, path, 4)
+        self.assert_queries(self.anonymous, path, 1)
+        self.assert_queries(self.client, path, 3)
+
+    def test_destroy_independent_of_ingredients(self):
+        counts = []
+        # Two and five ingredients.
+        for recipe in (self.recipes[4], self.recipes[7]):
+            client = APIClient()
+            client.force_authenticate(recipe.author)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.delete(f'/api/recipes/{recipe.id}/')
+            self.assertEqual(response.status_code, 204)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class RecipeOrderingTest(RecipeDataTestCase):
+
+    def test_counter_ties_ordered_by_id(self):
+        Recipe.objects.filter(pk=self.recipes[3].pk).update(favorites_count=2)
+        pages = [
+            self.anonymous.get(
+                f'/api/recipes/?ordering=-favorites_count&limit=5&page={page}'
+            ).data['results']
+            for page in (1, 2, 3)
+        ]
+        ids = [recipe['id'] for page in pages for recipe in page]
+        # recipes[0] is a favourite of users[2].
+        first = [self.recipes[3].id, self.recipes[0].id]
+        others = sorted((recipe.id for recipe in self.recipes
+                         if recipe.id not in first), reverse=True)
+        self.assertEqual(ids, [*first, *others])
+
+
+class CounterTest(RecipeDataTestCase):
+    """Counters follow relation changes made outside the API."""
+
+    def assert_counters(self):
+        for model, counter, related_model, related_field in COUNTERS:
+            with self.subTest(counter=counter):
+                self.assertEqual(reconcile(model, counter, related_model,
+                                           related_field), 0)
+
+    def test_fixture(self):
+        self.assert_counters()
+
+    def test_create_and_delete(self):
+        recipe = Recipe.objects.create(
+            name='Новый рецепт', author=self.users[2],
+            image='recipes/images/recipe.png', text='Описание',
+            cooking_time=1)
+        Favourite.objects.create(user=self.users[0], recipe=recipe)
+        ShoppingCart.objects.create(user=self.users[0], recipe=recipe)
+        Subscription.objects.create(user=self.users[0], author=self.users[1])
+        self.assert_counters()
+        Favourite.objects.get(recipe=self.recipes[0]).delete()
+        Subscription.objects.get(author=self.users[1]).delete()
+        self.recipes[1].delete()
+        recipe.delete()
+        self.assert_counters()
+
+    def test_moved_rows(self):
+        favourite = Favourite.objects.get(recipe=self.recipes[0])
+        favourite.recipe = self.recipes[5]
+        favourite.save()
+        self.recipes[2].author = self.users[2]
+        self.recipes[2].save()
+        self.assert_counters()
+
+    def test_deleted_user(self):
+        self.users[2].delete()
+        self.assert_counters()
+
+    def test_api(self):
+        self.client.post('/api/recipes/favorite/',
+                         {'recipes': [recipe.id for recipe in self.recipes]},
+                         format='json')
+        self.client.delete('/api/recipes/favorite/',
+                           {'recipes': [self.recipes[0].id]}, format='json')
+        self.client.post(f'/api/users/{self.users[1].id}/subscribe/')
+        self.client.delete(f'/api/users/{self.users[0].id}/subscribe/')
+        self.assert_counters()
+        response = self.client.get('/api/users/subscriptions/?limit=6')
+        self.assertEqual(response.data['results'][0]['recipes_count'], 6)
+
+
+class RelationEndpointTest(RecipeDataTestCase):
+    """Adding and removing favourites and cart recipes."""
+
+    RELATIONS = (
+        ('favorite', Favourite, 'favorites_count', 0),
+        ('shopping_cart', ShoppingCart, 'carts_count', 1),
+    )
+
+    def get_etag(self):
+        return self.client.get('/api/recipes/?limit=6')['ETag']
+
+    def assert_changed(self, method, path, recipe_ids, statuses):
+        etag = self.get_etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                path, {'recipes': recipe_ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'recipes': [
+            {'id': recipe_id, 'status': status}
+            for recipe_id, status in statuses]})
+        changed = any(status in ('added', 'removed')
+                      for _, status in statuses)
+        # Recipe flags of the user are part of the ETags.
+        self.assertEqual(self.get_etag() != etag, changed)
+
+    def assert_related(self, model, counter, recipe, related):
+        recipe.refresh_from_db()
+        self.assertEqual(getattr(recipe, counter), int(related))
+        self.assertEqual(model.objects.filter(
+            user=self.users[2], recipe=recipe).exists(), related)
+
+    def test_bulk(self):
+        missing = Recipe.objects.order_by('id').last().id + 1
+        for name, model, counter, position in self.RELATIONS:
+            with self.subTest(name=name):
+                path = f'/api/recipes/{name}/'
+                related, new = self.recipes[position], self.recipes[5]
+                self.assert_changed(
+                    'post', path, [new.id, related.id, missing, new.id],
+                    [(new.id, 'added'), (related.id, 'unchanged'),
+                     (missing, 'not_found')])
+                self.assert_related(model, counter, new, True)
+                self.assert_related(model, counter, related, True)
+                self.assert_changed(
+                    'post', path, [new.id], [(new.id, 'unchanged')])
+                self.assert_changed(
+                    'delete', path, [related.id, missing, self.recipes[6].id],
+                    [(related.id, 'removed'), (missing, 'not_found'),
+                     (self.recipes[6].id, 'unchanged')])
+                self.assert_related(model, counter, new, True)
+                self.assert_related(model, counter, related, False)
+
+    def test_single(self):
+        for name, model, counter, _ in self.RELATIONS:
+            with self.subTest(name=name):
+                path = f'/api/recipes/{self.recipes[5].id}/{name}/'
+                self.assertEqual(self.client.post(path).status_code, 201)
+                self.assertEqual(self.client.post(path).status_code, 400)
+                self.assert_related(model, counter, self.recipes[5], True)
+                self.assertEqual(self.client.delete(path).status_code, 204)
+                self.assertEqual(self.client.delete(path).status_code, 400)
+                self.assert_related(model, counter, self.recipes[5], False)
+
+    def test_invalid(self):
+        for name, *_ in self.RELATIONS:
+            with self.subTest(name=name):
+                path = f'/api/recipes/{name}/'
+                for data in ({}, {'recipes': []}, {'recipes': [0]},
+                             {'recipes': ['x']}):
+                    self.assertEqual(self.client.post(
+                        path, data, format='json').status_code, 400)
+                self.assertEqual(self.anonymous.post(
+                    path, {'recipes': [self.recipes[0].id]},
+                    format='json').status_code, 401)
+
+
+class ShoppingListTest(RecipeDataTestCase):
+    """Shopping lists equal the ingredient totals of the carts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # The fixture fills the cart without recipes.relations.
+        rebuild_shopping_lists()
+
+    def assert_shopping_list(self, user=None, client=None):
+        user = user or self.users[2]
+        expected = [
+            {'id': row['ingredient_id'], 'name': row['ingredient__name'],
+             'measurement_unit': row['ingredient__measurement_unit'],
+             'amount': row['total']}
+            for row in IngredientInRecipe.objects.filter(
+                recipe__shoppingcart_related__user=user).values(
+                'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit').annotate(
+                total=Sum('amount')).order_by('ingredient__name')
+        ]
+        response = (client or self.client).get('/api/recipes/shopping_list/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+        return expected
+
+    def test_add_and_remove(self):
+        self.assertTrue(self.assert_shopping_list())
+        for recipe in self.recipes[2:5]:
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+            self.assert_shopping_list()
+        for recipe in self.recipes[1:5]:
+            self.client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+            self.assert_shopping_list()
+        self.assertEqual(self.assert_shopping_list(), [])
+
+    def test_bulk(self):
+        self.client.post('/api/recipes/shopping_cart/', {
+            'recipes': [recipe.id for recipe in self.recipes[:6]]
+        }, format='json')
+        self.assert_shopping_list()
+        self.client.delete('/api/recipes/shopping_cart/', {
+            'recipes': [recipe.id for recipe in self.recipes[::2]]
+        }, format='json')
+        self.assert_shopping_list()
+
+    def test_recipe_deleted(self):
+        self.client.post(f'/api/recipes/{self.recipes[3].id}/shopping_cart/')
+        author = APIClient()
+        author.force_authenticate(self.recipes[3].author)
+        author.delete(f'/api/recipes/{self.recipes[3].id}/')
+        self.recipes[1].delete()
+        self.assertEqual(self.assert_shopping_list(), [])
+
+    def test_ingredient_rows_changed(self):
+        self.client.post(f'/api/recipes/{self.recipes[4].id}/shopping_cart/')
+        row = IngredientInRecipe.objects.filter(
+            recipe=self.recipes[1]).first()
+        row.amount += 100
+        row.save()
+        self.assert_shopping_list()
+        row.delete()
+        self.assert_shopping_list()
+        IngredientInRecipe.objects.create(
+            recipe=self.recipes[4], ingredient=self.ingredients[4],
+            amount=7)
+        self.assert_shopping_list()
+        self.ingredients[0].delete()
+        self.assert_shopping_list()
+
+    def test_other_users(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        client.post(f'/api/recipes/{self.recipes[1].id}/shopping_cart/')
+        self.client.delete(f'/api/recipes/{self.recipes[1].id}/shopping_cart/')
+        self.assertEqual(self.assert_shopping_list(), [])
+        self.assertTrue(self.assert_shopping_list(self.users[0], client))
+
+
+class CursorPaginationTest(RecipeDataTestCase):
+
+    def get_ids(self, path):
+        ids = []
+        while path:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            path = response.data['next']
+        return ids
+
+    def test_primary_key_order(self):
+        self.assertEqual(
+            self.get_ids('/api/recipes/?paginate=cursor&limit=5'),
+            sorted((recipe.id for recipe in self.recipes), reverse=True))
+        self.assertEqual(
+            self.get_ids('/api/recipes/feed/?paginate=cursor&limit=5'),
+            sorted((recipe.id for recipe in self.recipes
+                    if recipe.author == self.users[0]), reverse=True))
+        self.assertEqual(
+            self.get_ids('/api/users/subscriptions/?paginate=cursor'),
+            [self.users[0].id])
+
+    def test_ranked_or_ordered(self):
+        for query in (f'search={self.recipes[3].name}',
+                      f'ingredients={self.ingredients[0].id}',
+                      'ordering=-favorites_count'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    f'/api/recipes/?paginate=cursor&{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('paginate', response.data)
+
+
+class RecipeCacheTest(RecipeDataTestCase):
+
+    def test_changes_of_other_processes(self):
+        path = f'/api/recipes/{self.recipes[0].id}/'
+        self.assertEqual(self.anonymous.get(path).data['name'], 'Рецепт 0')
+        # update() sends no signals, like a change made in another process
+        # that does not share the cache.
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(
+            name='Новое имя', updated=timezone.now())
+        self.assertEqual(self.anonymous.get(path).data['name'], 'Новое имя')
+        response = self.anonymous.get('/api/recipes/?limit=1&author='
+                                      f'{self.users[0].id}')
+        self.assertEqual(response.data['results'][0]['name'], 'Новое имя')
+
+    def test_deleted_author(self):
+        path = f'/api/recipes/{self.recipes[1].id}/'
+        etag = self.anonymous.get(path)['ETag']
+        self.users[1].delete()
+        response = self.anonymous.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIsNone(response.data['author'])
+        client = APIClient()
+        client.force_authenticate(self.users[2])
+        self.assertIsNone(client.get(path).data['author'])
+
+
+class RowSerializerTest(RecipeDataTestCase):
+    """Lightweight serializers and renderer match the model serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.request = Request(APIRequestFactory().get('/api/recipes/'))
+        self.context = {'request': self.request}
+
+    def assert_same_json(self, data, expected):
+        self.assertEqual(JSONRenderer().render(data),
+                         JSONRenderer().render(expected))
+
+    def test_recipes(self):
+        Recipe.objects.filter(pk=self.recipes[2].pk).update(image_variants={
+            'source': 'recipes/images/recipe.png',
+            '320': 'recipes/images/variants/recipe_320.webp',
+            'placeholder': 'data:image/webp;base64,AAAA',
+        })
+        Recipe.objects.filter(pk=self.recipes[3].pk).update(author=None)
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        view = RecipeViewSet(request=self.request, format_kwarg=None)
+        expected = RecipeSerializer(
+            view.get_queryset().filter(id__in=recipe_ids).order_by('id'),
+            many=True, context=self.context).data
+        data = RecipeRowSerializer(
+            RecipeRowSerializer.get_rows(recipe_ids), many=True,
+            context=self.context).data
+        self.assert_same_json(data, expected)
+
+    def test_tags(self):
+        self.assert_same_json(
+            TagRowSerializer(TagRowSerializer.get_rows(Tag.objects.all()),
+                             many=True).data,
+            TagSerializer(Tag.objects.all(), many=True).data)
+
+    def test_ingredients(self):
+        self.assert_same_json(
+            IngredientRowSerializer(
+                IngredientRowSerializer.get_rows(Ingredient.objects.all()),
+                many=True).data,
+            IngredientSerializer(Ingredient.objects.all(), many=True).data)
+
+    def test_renderer(self):
+        recipes = RecipeSerializer(
+            Recipe.objects.all(), many=True, context=self.context).data
+        data = {
+            'recipes': recipes,
+            'created': timezone.now(),
+            'day': datetime.date(2024, 3, 21),
+            'amount': Decimal('1.50'),
+            'uuid': uuid.uuid4(),
+            'text': 'строка\u2028с\u2029разделителями "и" кавычками',
+            1: [None, True, 1.5],
+        }
+        for media_type in (None, 'application/json; indent=4'):
+            with self.subTest(media_type=media_type):
+                self.assertEqual(
+                    ORJSONRenderer().render(data, media_type),
+                    JSONRenderer().render(data, media_type))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTest(RecipeDataTestCase):
+    """Reads go to a replica, except for clients that just wrote.
+
+    The replica is a separate empty database rather than a test mirror of
+    the primary, so reads that reach it see no recipes. It is added after
+    the test databases are set up and is never written to.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Keeps uploaded images out of the real MEDIA_ROOT.
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root.name)
+        cls.media_settings.enable()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        with connections['replica'].schema_editor() as editor:
+            for model in apps.get_models():
+                if not model._meta.proxy:
+                    editor.create_model(model)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        cls.media_settings.disable()
+        cls.media_root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.get_client(self.users[0])
+        self.other = self.get_client(self.users[1])
+
+    def get_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+        return client
+
+    def get_count(self, client):
+        response = client.get('/api/recipes/?limit=6')
+        self.assertEqual(response.status_code, 200)
+        return response.data['count']
+
+    def test_anonymous_reads_from_replica(self):
+        self.assertEqual(self.get_count(self.anonymous), 0)
+        response = self.anonymous.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_author_reads_own_writes(self):
+        self.assertEqual(self.get_count(self.author), 0)
+        response = self.author.post('/api/recipes/', {
+            'tags': [self.tags[0].id],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+            'image': ('data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BA'
+                      'EAAAAALAAAAAABAAEAAAIBRAA7'),
+            'name': 'Новый рецепт', 'text': 'Описание', 'cooking_time': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        path = f'/api/recipes/{response.data["id"]}/'
+        self.assertEqual(self.get_count(self.author), len(self.recipes) + 1)
+        self.assertEqual(self.author.get(path).status_code, 200)
+        self.assertEqual(self.get_count(self.other), 0)
+        self.assertEqual(self.get_count(self.anonymous), 0)
+        self.assertEqual(self.anonymous.get(path).status_code, 404)
+        # The pin expires after REPLICA_PIN_SECONDS.
+        cache.delete(get_pin_key(self.author.get(path).wsgi_request))
+        self.assertEqual(self.get_count(self.author), 0)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadTest(SimpleTestCase):
+    """Middleware lets concurrent async reads overlap under ASGI."""
+
+    async def get_concurrently(self, count, content):
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            self.async_client.get('/api/slow/') for _ in range(count)))
+        self.assertEqual([response.content for response in responses],
+                         [content] * count)
+        return time.perf_counter() - start
+
+    async def test_reads_overlap(self):
+        # The view tells whether it may read from a replica.
+        for replicas, content in (([], b'False'), (['replica'], b'True')):
+            with self.subTest(replicas=replicas), \
+                    override_settings(DATABASE_REPLICAS=replicas):
+                self.assertLess(await self.get_concurrently(4, content),
+                                2 * SLOW_VIEW_SECONDS)
+
+
+class TokenCacheTest(RecipeDataTestCase):
+    """Changes of tokens and users reach cached tokens."""
+
+    def setUp(self):
+        super().setUp()
+        token_user_cache.clear()
+        self.token = Token.objects.create(user=self.users[0])
+        self.author = APIClient()
+        self.author.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.get_me(), 200)
+
+    def get_me(self):
+        return self.author.get('/api/users/me/').status_code
+
+    def test_logout(self):
+        self.assertEqual(self.author.post('/api/auth/token/logout/')
+                         .status_code, 204)
+        self.assertEqual(self.get_me(), 401)
+
+    def test_password_change(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        user.set_password('N3wPa55word!x')
+        user.save()
+        user, _ = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+        self.assertTrue(user.check_password('N3wPa55word!x'))
+
+    def test_deactivation(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.get_me(), 401)
+
+    def test_other_processes(self):
+        other = TokenUserCache(ttl=60, max_size=10)
+        other.set(self.token.key, self.users[0], self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].save()
+        self.assertIsNone(other.get(self.token.key))
+        other.set(self.token.key, self.users[0], self.token)
+        self.assertIsNotNone(other.get(self.token.key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertIsNone(other.get(self.token.key))
@@ -1,13 +1,36 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import URLPattern, include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .asynchronous import async_read_view
+from .views import IngredientViewSet, MetricsView, RecipeViewSet, TagViewSet
 
 router = DefaultRouter()
 router.register('tags', TagViewSet)
 router.register('ingredients', IngredientViewSet)
 router.register('recipes', RecipeViewSet)
 
+ASYNC_READ_ROUTES = (
+    'recipe-list',
+    'recipe-detail',
+    'recipe-download-shopping-cart',
+    'recipe-shopping-list',
+    'ingredient-list',
+    'ingredient-detail',
+    'tag-list',
+    'tag-detail',
+)
+
+routes = router.urls
+if settings.ASYNC_READ_VIEWS:
+    routes = [
+        URLPattern(route.pattern, async_read_view(route.callback),
+                   route.default_args, route.name)
+        if route.name in ASYNC_READ_ROUTES else route
+        for route in routes
+    ]
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('', include(routes)),
 ]
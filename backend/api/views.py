@@ -1,61 +1,94 @@
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from .filters import TagsInRecipeFilter, IngredientFilter
+from .autocomplete import ingredient_index
+from .caching import CachedListMixin, CachedRecipeMixin
+from .filters import TagsInRecipeFilter
+from .metrics import render_metrics
 from .pagination import Pagination
-from .permissions import (AllowAnyOrIsAdminOrReadOnly,
+from .permissions import (AllowAnyOrIsAdminOrReadOnly, IsAdminOrLocalRequest,
                           IsAuthorOrAdminOrReadOnly)
 from .serializers import (IngredientSerializer, RecipeForSubSerializer,
-                          RecipeSerializer, TagSerializer)
-from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+                          RecipeIdsSerializer, RecipeSerializer,
+                          ShoppingListItemSerializer, TagRowSerializer,
+                          TagSerializer)
+from .shopping_cart import RENDERERS, SHOPPING_CART_FILETYPES
+from constraints.constraints import ingredient_search_limit
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.relations import add_recipes, remove_recipes
 
 User = get_user_model()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class MetricsView(APIView):
+    permission_classes = (IsAdminOrLocalRequest,)
+
+    def get(self, request):
+        return HttpResponse(render_metrics(),
+                            content_type=CONTENT_TYPE_LATEST)
+
+
+class TagViewSet(CachedListMixin, ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAnyOrIsAdminOrReadOnly,)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    def get_list_data(self, request):
+        return TagRowSerializer(TagRowSerializer.get_rows(
+            self.get_queryset()), many=True).data
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, ReadOnlyModelViewSet):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAnyOrIsAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
-
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all()
-    permission_classes = (IsAuthorOrAdminOrReadOnly)
+    def get_list_data(self, request):
+        name = request.query_params.get('name')
+        if name is None:
+            return ingredient_index.all()
+        return ingredient_index.search(name, ingredient_search_limit)
+
+
+class RecipeViewSet(CachedRecipeMixin, ModelViewSet):
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        Prefetch('ingredient_list',
+                 queryset=IngredientInRecipe.objects.select_related(
+                     'ingredient')),
+    )
+    permission_classes = (IsAuthorOrAdminOrReadOnly,)
     serializer_class = RecipeSerializer
     pagination_class = Pagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TagsInRecipeFilter
 
     def get_queryset(self):
-        return super().get_queryset()
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(is_favorited=Value(False),
+                                     is_in_shopping_cart=Value(False))
+        return queryset.annotate(
+            is_favorited=Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
 
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
@@ -66,6 +99,58 @@ class RecipeViewSet(ModelViewSet):
     def update(self, request, *args, **kwargs):
         return super().update(request, *args, **kwargs)
 
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        return self.list_recipes(self.filter_queryset(Recipe.objects.filter(
+            feed_related__user=request.user).order_by('-id')))
+
+    def change_recipes(self, request, model):
+        """Add (POST) or remove (DELETE) many recipes at once.
+
+        Each requested id is reported as added/removed, as unchanged
+        (already there or not there) or as not_found.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data['recipes']))
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids).values_list('id', flat=True))
+        existing = [recipe_id for recipe_id in recipe_ids
+                    if recipe_id in found]
+        if request.method == 'POST':
+            changed = add_recipes(model, request.user, existing)
+            done = 'added'
+        else:
+            changed = remove_recipes(model, request.user, existing)
+            done = 'removed'
+        changed = set(changed)
+        return Response({'recipes': [
+            {'id': recipe_id,
+             'status': (done if recipe_id in changed
+                        else 'unchanged' if recipe_id in found
+                        else 'not_found')}
+            for recipe_id in recipe_ids
+        ]})
+
+    @action(detail=False, methods=['post'], url_path='shopping_cart',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_many(self, request):
+        return self.change_recipes(request, ShoppingCart)
+
+    @shopping_cart_many.mapping.delete
+    def remove_many_from_shopping_cart(self, request):
+        return self.change_recipes(request, ShoppingCart)
+
+    @action(detail=False, methods=['post'], url_path='favorite',
+            permission_classes=[IsAuthenticated])
+    def favorite_many(self, request):
+        return self.change_recipes(request, Favourite)
+
+    @favorite_many.mapping.delete
+    def unfavorite_many(self, request):
+        return self.change_recipes(request, Favourite)
+
     @action(detail=True, methods=['post'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk=None):
@@ -74,9 +159,7 @@ class RecipeViewSet(ModelViewSet):
         except Recipe.DoesNotExist:
             return Response({'error': 'Recipe does not exist'},
                             status=status.HTTP_400_BAD_REQUEST)
-        shopping_cart, created = ShoppingCart.objects.get_or_create(
-            user=request.user, recipe=recipe)
-        if created:
+        if add_recipes(ShoppingCart, request.user, [recipe.id]):
             serializer = RecipeForSubSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
@@ -86,44 +169,42 @@ class RecipeViewSet(ModelViewSet):
     @shopping_cart.mapping.delete
     def remove_from_shopping_cart(self, request, pk=None):
         recipe = get_object_or_404(Recipe, id=pk)
-        try:
-            shopping_cart_item = ShoppingCart.objects.get(user=request.user,
-                                                          recipe=recipe)
-            shopping_cart_item.delete()
+        if remove_recipes(ShoppingCart, request.user, [recipe.id]):
             return Response({'status': 'Recipe removed from shopping cart'},
                             status=status.HTTP_204_NO_CONTENT)
-        except ShoppingCart.DoesNotExist:
+        else:
             return Response({'error': 'The recipe not in shopping cart'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-    @action(methods=("get",), detail=False)
-    def download_shopping_cart(self, request):
-        shopping_cart_items = ShoppingCart.objects.filter(user=request.user
-                                                          ).prefetch_related(
-            'recipe',
-            'recipe__ingredient_list',
-            'recipe__ingredient_list__ingredient'
-        )
-
-        shopping_cart_content = "Shopping list:\n\n"
-
-        ingredients = {}
-
-        for item in shopping_cart_items:
-            for ingredient in item.recipe.ingredient_list.all():
-                key = (ingredient.ingredient.name,
-                       ingredient.ingredient.measurement_unit)
-                if key in ingredients:
-                    ingredients[key] += ingredient.amount
-                else:
-                    ingredients[key] = ingredient.amount
-
-        for (name, unit), amount in ingredients.items():
-            shopping_cart_content += f"{name} - {amount} {unit}\n"
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def shopping_list(self, request):
+        # Kept up to date by recipes.shopping_list, one row per distinct
+        # ingredient of the cart.
+        items = ShoppingListItem.objects.filter(
+            user=request.user).select_related('ingredient').order_by(
+            'ingredient__name')
+        serializer = ShoppingListItemSerializer(items, many=True)
+        return Response(serializer.data)
 
-        response = HttpResponse(shopping_cart_content,
-                                content_type="text/plain; charset=utf-8")
-        response['Content-Disposition'] = 'attachment; filename="shg_cart.txt"'
+    @action(methods=("get",), detail=False,
+            permission_classes=[IsAuthenticated])
+    def download_shopping_cart(self, request):
+        filetype = request.query_params.get('filetype', 'txt')
+        if filetype not in SHOPPING_CART_FILETYPES:
+            raise ValidationError({'filetype': 'Supported filetypes: '
+                                   + ', '.join(SHOPPING_CART_FILETYPES)})
+
+        ingredients = list(ShoppingListItem.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name'))
+
+        response = StreamingHttpResponse(
+            RENDERERS[filetype](ingredients),
+            content_type=SHOPPING_CART_FILETYPES[filetype])
+        response['Content-Disposition'] = (
+            f'attachment; filename="shg_cart.{filetype}"')
         return response
 
     @action(detail=True, methods=['post'],
@@ -135,11 +216,7 @@ class RecipeViewSet(ModelViewSet):
             raise ValidationError({'detail': 'There is no such recipe'},
                                   code=status.HTTP_400_BAD_REQUEST)
 
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        favorite, created = Favourite.objects.get_or_create(user=user,
-                                                            recipe=recipe)
-        if created:
+        if add_recipes(Favourite, request.user, [recipe.id]):
             serializer = RecipeForSubSerializer(recipe,
                                                 context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -150,10 +227,7 @@ class RecipeViewSet(ModelViewSet):
     @favorite.mapping.delete
     def unfavorite(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        favorite = Favourite.objects.filter(user=user, recipe=recipe).first()
-        if favorite:
-            favorite.delete()
+        if remove_recipes(Favourite, request.user, [recipe.id]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response({'detail': 'The recipe is not in favorites'},
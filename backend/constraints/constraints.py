@@ -7,3 +7,9 @@ max_tag_slug_length = 200
 max_ingridient_name = 200
 max_measurement_unit_length = 200
 max_recipe_length = 200
+
+default_recipes_limit = 3
+max_recipes_limit = 50
+ingredient_search_limit = 50
+max_missing_ingredients = 2
+max_bulk_recipes = 100
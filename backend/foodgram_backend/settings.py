@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,10 +68,52 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
     }
 }
 
+# Comma separated hosts of read replicas of the primary database.
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Safe-method API requests read from these aliases, see api.replicas.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+# How long a client reads from the primary after a write; longer than the
+# replication lag.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# Seconds an ingredient autocomplete index may live before it is rebuilt,
+# so that changes made through other worker processes are picked up.
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+RECIPE_INGREDIENT_INDEX_TTL = int(
+    os.getenv('RECIPE_INGREDIENT_INDEX_TTL', 300))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Lifetime of pre-rendered API responses; model signals invalidate them
+# earlier by bumping a version counter.
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60 * 60 * 24))
+if CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    # Each process has its own local-memory cache and misses the version
+    # bumps made by other processes, so its responses are not kept longer
+    # than the in-process indexes. Several workers need a shared cache.
+    API_CACHE_TIMEOUT = min(API_CACHE_TIMEOUT, INGREDIENT_INDEX_TTL)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,6 +151,12 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized copies of recipe images are built off the request path by a
+# small per-process thread pool.
+RECIPE_IMAGE_WIDTHS = (320, 640, 1280)
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -117,7 +167,12 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
@@ -130,3 +185,15 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'users.User'
+
+# Serve the hottest read endpoints with async views (api.asynchronous) when
+# running under ASGI; reads then run in a pool of this many threads.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+ASYNC_READ_WORKERS = int(os.getenv('ASYNC_READ_WORKERS', 8))
+
+# Per-process cache of authentication tokens (api.authentication). Logouts,
+# password changes and deactivations reach other worker processes through
+# the shared cache; with the local-memory cache they keep accepting the old
+# token or user for up to TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+bind = '0.0.0.0:8000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+# GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker serves the ASGI
+# application with async read views instead of the WSGI one.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class.startswith('uvicorn'):
+    wsgi_app = 'foodgram_backend.asgi:application'
+    os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+else:
+    wsgi_app = 'foodgram_backend.wsgi'
+
+
+def on_starting(server):
+    # Metric files of previous runs would be merged into the new ones.
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
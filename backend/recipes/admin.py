@@ -1,9 +1,21 @@
-from django.contrib import admin
-import json
-from django import forms
+import io
+from pathlib import Path
 
+from django.contrib import admin, messages
+from django import forms
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import redirect
+from django.urls import path
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
+
+from .loaders import (DEFAULT_BATCH_SIZE, DEFAULT_INGREDIENTS_PATH, READERS,
+                      load_ingredients)
 from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
                      ShoppingCart, Tag)
+from .relations import lock_users
+from .shopping_list import rebuild_shopping_lists
 
 if admin.site.is_registered(Ingredient):
     admin.site.unregister(Ingredient)
@@ -18,7 +30,7 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'author', 'cooking_time']
-    search_fields = ['name', 'author__username', 'ingredients__name']
+    search_fields = ['name', 'author__username', 'search_document']
     list_filter = ['tags']
 
 
@@ -39,10 +51,33 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ['user', 'recipe']
     search_fields = ['user__username', 'recipe__name']
 
+    # Cart rows changed here bypass recipes.relations, so the shopping
+    # lists of the affected users are recalculated.
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        user_ids = [obj.user_id]
+        if change and 'user' in form.changed_data:
+            user_ids.append(form.initial['user'])
+        lock_users(user_ids)
+        super().save_model(request, obj, form, change)
+        rebuild_shopping_lists(user_ids)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        lock_users([obj.user_id])
+        super().delete_model(request, obj)
+        rebuild_shopping_lists([obj.user_id])
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        user_ids = lock_users(queryset.values('user_id'))
+        super().delete_queryset(request, queryset)
+        rebuild_shopping_lists(user_ids)
+
 
 class IngredientUploadForm(forms.ModelForm):
     ingredients_file = forms.FileField(
-        required=False, label='Загрузить ингредиенты из JSON файла')
+        required=False, label='Загрузить ингредиенты из JSON или CSV файла')
 
     class Meta:
         model = Ingredient
@@ -51,12 +86,13 @@ class IngredientUploadForm(forms.ModelForm):
     def save(self, commit=True):
         ingredients_file = self.cleaned_data.get('ingredients_file', None)
         if ingredients_file:
-            ingredients_data = json.load(ingredients_file)
-            for item in ingredients_data:
-                Ingredient.objects.get_or_create(
-                    name=item['name'],
-                    defaults={'measurement_unit': item['measurement_unit']}
-                )
+            file_format = Path(ingredients_file.name).suffix.lstrip('.')
+            reader = READERS.get(file_format.lower(), READERS['json'])
+            load_ingredients(
+                reader(io.TextIOWrapper(ingredients_file, encoding='utf-8',
+                                        newline='')),
+                DEFAULT_BATCH_SIZE,
+            )
         return super().save(commit=commit)
 
 
@@ -64,6 +100,34 @@ class IngredientAdmin(admin.ModelAdmin):
     form = IngredientUploadForm
     list_display = ['name', 'measurement_unit']
 
+    # A button on the change list (see the change_list_object_tools.html
+    # template) rather than an action: actions need selected rows, and the
+    # dictionary is loaded into an empty table.
+    def get_urls(self):
+        return [
+            path('load-default/',
+                 self.admin_site.admin_view(self.load_default_ingredients),
+                 name='recipes_ingredient_load_default'),
+            *super().get_urls(),
+        ]
+
+    @method_decorator(require_POST)
+    def load_default_ingredients(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        try:
+            with DEFAULT_INGREDIENTS_PATH.open(
+                    encoding='utf-8', newline='') as stream:
+                inserted, skipped = load_ingredients(
+                    READERS['csv'](stream), DEFAULT_BATCH_SIZE)
+        except (OSError, ValueError) as error:
+            self.message_user(request, f'Не удалось загрузить: {error}',
+                              messages.ERROR)
+        else:
+            self.message_user(
+                request, f'Добавлено: {inserted}, пропущено: {skipped}.')
+        return redirect('admin:recipes_ingredient_changelist')
+
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
 
@@ -0,0 +1,63 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favourite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def change_counter(model, counter, ids, delta):
+    """Shift a denormalized counter of the given rows by `delta`.
+
+    Call it inside the transaction that changes the counted relation.
+    Counters never go below zero, even if they drifted before.
+    """
+    model.objects.filter(id__in=ids).update(
+        **{counter: Greatest(F(counter) + delta, 0)})
+
+
+class BulkCounted(threading.local):
+    """Relation models whose counters the current thread changes in bulk.
+
+    Receivers in recipes.signals keep the counters of single rows; they
+    skip rows of these models.
+    """
+
+    def __init__(self):
+        self.models = set()
+
+
+bulk_counted = BulkCounted()
+
+
+@contextmanager
+def counted_in_bulk(model):
+    bulk_counted.models.add(model)
+    try:
+        yield
+    finally:
+        bulk_counted.models.discard(model)
+
+
+def reconcile(model, counter, related_model, related_field):
+    """Rewrite counters that drifted from the real relation size."""
+    actual = Coalesce(Subquery(
+        related_model.objects.filter(**{related_field: OuterRef('pk')})
+        .order_by().values(related_field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+    return model.objects.annotate(actual=actual).exclude(
+        **{counter: F('actual')}).update(**{counter: actual})
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favourite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
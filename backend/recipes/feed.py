@@ -0,0 +1,35 @@
+from users.models import Subscription
+
+from .models import Feed, Recipe
+
+FEED_BATCH_SIZE = 1000
+
+
+def fan_out_recipe(recipe):
+    """Put a new recipe into the feed of every subscriber of its author."""
+    subscribers = Subscription.objects.filter(
+        author_id=recipe.author_id).values_list('user_id', flat=True)
+    Feed.objects.bulk_create(
+        (Feed(user_id=user_id, recipe=recipe)
+         for user_id in subscribers.iterator()),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(subscription):
+    recipes = Recipe.objects.filter(
+        author_id=subscription.author_id).values_list('id', flat=True)
+    Feed.objects.bulk_create(
+        (Feed(user_id=subscription.user_id, recipe_id=recipe_id)
+         for recipe_id in recipes.iterator()),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim_feed(subscription):
+    Feed.objects.filter(
+        user_id=subscription.user_id,
+        recipe__author_id=subscription.author_id,
+    ).delete()
@@ -0,0 +1,126 @@
+import base64
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'recipes/variants/'
+PLACEHOLDER_WIDTH = 16
+
+if features.check('webp'):
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'WEBP', 'webp'
+else:
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'JPEG', 'jpg'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def encode(image, width):
+    """Return `image` scaled down to `width` pixels in the variant format."""
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, IMAGE_FORMAT,
+               quality=settings.RECIPE_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(image_field):
+    """Write resized copies of a recipe image and describe them.
+
+    The result maps each width to a storage name, plus a tiny inline
+    placeholder and the name of the source the variants were made from.
+    """
+    with image_field.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert(
+            'RGBA' if IMAGE_FORMAT == 'WEBP' and 'A' in image.getbands()
+            else 'RGB')
+
+    stem = os.path.splitext(os.path.basename(image_field.name))[0]
+    variants = {'source': image_field.name}
+    for width in settings.RECIPE_IMAGE_WIDTHS:
+        name = f'{VARIANTS_DIR}{stem}_{width}.{IMAGE_EXTENSION}'
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        variants[str(width)] = default_storage.save(
+            name, ContentFile(encode(image, width)))
+
+    placeholder = base64.b64encode(encode(image, PLACEHOLDER_WIDTH)).decode()
+    variants['placeholder'] = (
+        f'data:image/{IMAGE_FORMAT.lower()};base64,{placeholder}')
+    return variants
+
+
+def variant_names(variants):
+    """Storage names of the resized files described by `variants`."""
+    return {name for width, name in variants.items() if width.isdigit()}
+
+
+def delete_variant_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.exception('Could not delete image variant %s', name)
+
+
+def store_variants(recipe_id):
+    """Build variants of the current image of a recipe and store them,
+    deleting the files of the variants they replace."""
+    recipe = Recipe.objects.only('image').get(pk=recipe_id)
+    if not recipe.image:
+        return
+    variants = build_variants(recipe.image)
+    with transaction.atomic():
+        current = Recipe.objects.select_for_update().only(
+            'image_variants').filter(pk=recipe_id,
+                                     image=recipe.image.name).first()
+        if current is None:
+            # The image was replaced while we were working.
+            delete_variant_files(variant_names(variants))
+            return
+        Recipe.objects.filter(pk=recipe_id).update(
+            image_variants=variants, updated=timezone.now())
+        stale = (variant_names(current.image_variants)
+                 - variant_names(variants))
+        transaction.on_commit(lambda: delete_variant_files(stale))
+        # Imported here, the signals module schedules this module's work.
+        from .signals import image_variants_built
+
+        image_variants_built.send(sender=Recipe, recipe_ids=[recipe_id])
+
+
+def process_recipe_image(recipe_id):
+    try:
+        store_variants(recipe_id)
+    except Exception:
+        logger.exception('Could not process image of recipe %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_recipe_image(recipe_id):
+    """Process the image in the worker pool once the transaction commits."""
+    transaction.on_commit(
+        lambda: executor.submit(process_recipe_image, recipe_id))
+
+
+def variants_outdated(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name)
@@ -0,0 +1,77 @@
+import bisect
+from array import array
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .local_cache import LocalCache
+from .models import IngredientInRecipe
+
+
+class IngredientRecipeIndex:
+    """Per-process inverted index from ingredients to recipes."""
+
+    def __init__(self, ttl):
+        self._cache = LocalCache(ttl)
+
+    def _build(self):
+        # Sorted recipe ids per ingredient, next to the ingredient ids of
+        # each recipe; both are updated in place by `update`.
+        postings, recipes = {}, {}
+        # Kept until it expires, so not read from a lagging replica.
+        rows = IngredientInRecipe.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'ingredient_id', 'recipe_id').values_list(
+            'ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator():
+            postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+            recipes.setdefault(recipe_id, array('q')).append(ingredient_id)
+        return postings, recipes
+
+    def update(self, recipe_ids):
+        """Reload the ingredients of the given recipes from the database."""
+        with self._cache.lock:
+            index = self._cache.peek('index')
+            if index is None:
+                return
+            postings, recipes = index
+            current = {recipe_id: array('q') for recipe_id in recipe_ids}
+            for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list('recipe_id', 'ingredient_id'):
+                current[recipe_id].append(ingredient_id)
+
+            for recipe_id, ingredient_ids in current.items():
+                for ingredient_id in recipes.pop(recipe_id, ()):
+                    posting = postings[ingredient_id]
+                    del posting[bisect.bisect_left(posting, recipe_id)]
+                if not ingredient_ids:
+                    continue
+                recipes[recipe_id] = ingredient_ids
+                for ingredient_id in ingredient_ids:
+                    posting = postings.setdefault(
+                        ingredient_id, array('q'))
+                    posting.insert(
+                        bisect.bisect_left(posting, recipe_id), recipe_id)
+
+    def match(self, ingredient_ids, max_missing):
+        """Group recipes cookable from `ingredient_ids` by missing count.
+
+        Returns a list where item `n` holds ids of recipes that need `n`
+        ingredients besides the given ones, for `n` up to `max_missing`.
+        """
+        hits = {}
+        with self._cache.lock:
+            postings, recipes = self._cache.get('index', self._build)
+            for ingredient_id in set(ingredient_ids):
+                for recipe_id in postings.get(ingredient_id, ()):
+                    hits[recipe_id] = hits.get(recipe_id, 0) + 1
+            groups = [[] for _ in range(max_missing + 1)]
+            for recipe_id, count in hits.items():
+                missing = len(recipes[recipe_id]) - count
+                if missing <= max_missing:
+                    groups[missing].append(recipe_id)
+        return groups
+
+
+ingredient_recipe_index = IngredientRecipeIndex(
+    ttl=settings.RECIPE_INGREDIENT_INDEX_TTL)
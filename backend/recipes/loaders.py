@@ -0,0 +1,80 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Ingredient
+from .signals import ingredients_imported
+
+DEFAULT_INGREDIENTS_PATH = (
+    settings.BASE_DIR.parent / 'data' / 'ingredients.csv')
+DEFAULT_BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(stream):
+    for row in csv.reader(stream):
+        if row:
+            name, measurement_unit = row
+            yield name, measurement_unit
+
+
+def read_json(stream):
+    """Yield items of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = stream.read(JSON_CHUNK_SIZE)
+        buffer, position = buffer[position:] + chunk, 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('Expected a JSON array of ingredients.')
+                started, position = True, position + 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+            position = end
+        if not chunk:
+            raise ValueError('Unexpected end of JSON array.')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def load_ingredients(rows, batch_size):
+    """Insert (name, measurement_unit) rows, skipping existing ones.
+
+    Returns the number of inserted and skipped rows.
+    """
+    processed = 0
+    with transaction.atomic():
+        before = Ingredient.objects.count()
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch),
+                ignore_conflicts=True,
+            )
+            processed += len(batch)
+        inserted = Ingredient.objects.count() - before
+    if inserted:
+        ingredients_imported.send(sender=Ingredient)
+    return inserted, processed - inserted
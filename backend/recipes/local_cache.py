@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """Per-process LRU cache whose entries expire after `ttl` seconds.
+
+    Signals drop entries changed in this process; changes made in other
+    worker processes go unnoticed until the entries expire.
+    """
+
+    def __init__(self, ttl, max_size=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.RLock()
+        self._entries = OrderedDict()
+
+    def get(self, key, build=None):
+        """Return the live value of `key`, building a missing one."""
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+            if build is None:
+                return None
+            value = build()
+            self.set(key, value)
+            return value
+
+    def peek(self, key):
+        """Return the value of `key` even if it expired."""
+        with self.lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while self.max_size and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self.lock:
+            for key in [key for key, (_, value) in self._entries.items()
+                        if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
@@ -0,0 +1,136 @@
+import io
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from recipes.counters import COUNTERS, reconcile
+from recipes.feed import backfill_feed
+from recipes.loaders import (DEFAULT_BATCH_SIZE, DEFAULT_INGREDIENTS_PATH,
+                             READERS, load_ingredients)
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.search import refresh_search_documents
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscription
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'generated_user_'
+# Amounts of generated objects per unit of --scale.
+USERS = 30
+TAGS = 6
+RECIPES = 120
+INGREDIENTS_PER_RECIPE = (3, 12)
+FAVORITES_PER_USER = (0, 15)
+CARTS_PER_USER = (0, 6)
+SUBSCRIPTIONS_PER_USER = (0, 8)
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with deterministic synthetic data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    @transaction.atomic
+    def handle(self, *args, scale, seed, **options):
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Synthetic data has already been generated.')
+        rng = random.Random(seed)
+
+        if not Ingredient.objects.exists():
+            with DEFAULT_INGREDIENTS_PATH.open(encoding='utf-8',
+                                               newline='') as stream:
+                load_ingredients(READERS['csv'](stream), DEFAULT_BATCH_SIZE)
+        ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', 'name'))
+
+        password = make_password('generated-password')
+        users = User.objects.bulk_create((
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            ) for number in range(USERS * scale)
+        ), batch_size=BATCH_SIZE)
+        users = list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX).order_by('id'))
+
+        existing_tags = Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', slug=f'generated-tag-{number}',
+                color=f'#{number:06x}')
+            for number in range(existing_tags, existing_tags + TAGS)
+        )
+        tags = list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+        image = self.save_image()
+        recipe_ingredients = []
+        recipes = []
+        for number in range(RECIPES * scale):
+            chosen = rng.sample(ingredients,
+                                rng.randint(*INGREDIENTS_PER_RECIPE))
+            recipe_ingredients.append(chosen)
+            recipes.append(Recipe(
+                name=f'{chosen[0][1].capitalize()} по-домашнему №{number}',
+                text='Смешать ' + ', '.join(name for _, name in chosen) + '.',
+                author=rng.choice(users),
+                image=image,
+                cooking_time=rng.randint(5, 180),
+            ))
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        recipes = list(Recipe.objects.filter(image=image).order_by('id'))
+
+        Recipe.tags.through.objects.bulk_create((
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in rng.sample(tags, rng.randint(1, 3))
+        ), batch_size=BATCH_SIZE)
+        IngredientInRecipe.objects.bulk_create((
+            IngredientInRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                               amount=rng.randint(1, 500))
+            for recipe, chosen in zip(recipes, recipe_ingredients)
+            for ingredient_id, _ in chosen
+        ), batch_size=BATCH_SIZE)
+
+        for model, amount in ((Favourite, FAVORITES_PER_USER),
+                              (ShoppingCart, CARTS_PER_USER)):
+            model.objects.bulk_create((
+                model(user=user, recipe=recipe)
+                for user in users
+                for recipe in rng.sample(recipes, rng.randint(*amount))
+            ), batch_size=BATCH_SIZE)
+        Subscription.objects.bulk_create((
+            Subscription(user=user, author=author)
+            for user in users
+            for author in rng.sample(users, rng.randint(
+                *SUBSCRIPTIONS_PER_USER))
+            if author != user
+        ), batch_size=BATCH_SIZE)
+
+        # Bulk inserts skip the signals maintaining derived data.
+        for counter in COUNTERS:
+            reconcile(*counter)
+        refresh_search_documents(Recipe.objects.filter(image=image))
+        rebuild_shopping_lists([user.pk for user in users])
+        for subscription in Subscription.objects.filter(user__in=users):
+            backfill_feed(subscription)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users, {len(recipes)} recipes.'))
+
+    def save_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), '#e0a060').save(buffer, 'PNG')
+        return default_storage.save('recipes/images/generated.png',
+                                    ContentFile(buffer.getvalue()))
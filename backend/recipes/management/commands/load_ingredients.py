@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.loaders import (DEFAULT_BATCH_SIZE, DEFAULT_INGREDIENTS_PATH,
+                             READERS, load_ingredients)
+
+
+class Command(BaseCommand):
+    help = 'Load ingredients from a CSV or JSON file in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', type=Path,
+                            default=DEFAULT_INGREDIENTS_PATH)
+        parser.add_argument('--format', choices=READERS,
+                            help='File format, guessed from the extension '
+                                 'by default.')
+        parser.add_argument('--batch-size', type=int,
+                            default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, path, batch_size, **options):
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Unknown ingredients format: {file_format}')
+        try:
+            with path.open(encoding='utf-8', newline='') as stream:
+                inserted, skipped = load_ingredients(
+                    READERS[file_format](stream), batch_size)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Could not load {path}: {error!r}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {inserted} ingredients, skipped {skipped}.'))
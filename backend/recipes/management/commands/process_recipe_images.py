@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipes.image_variants import (executor, process_recipe_image,
+                                    variants_outdated)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build resized copies of recipe images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild variants for every recipe, not only outdated ones.')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only('image', 'image_variants').iterator()
+        recipe_ids = [
+            recipe.pk for recipe in recipes
+            if options['all'] or variants_outdated(recipe)
+        ]
+        for done, _ in enumerate(
+                executor.map(process_recipe_image, recipe_ids), start=1):
+            if done % 100 == 0:
+                self.stdout.write(f'Processed {done} of {len(recipe_ids)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(recipe_ids)} recipe images.'))
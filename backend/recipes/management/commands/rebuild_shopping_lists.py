@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Recalculate materialized shopping lists from the carts.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rebuild_shopping_lists()
+        self.stdout.write(self.style.SUCCESS('Shopping lists rebuilt.'))
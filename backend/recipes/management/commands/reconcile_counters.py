@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized recipe and user counters.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, counter, related_model, related_field in COUNTERS:
+            fixed = reconcile(model, counter, related_model, related_field)
+            self.stdout.write(
+                f'{model.__name__}.{counter}: {fixed} rows fixed')
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    Feed = apps.get_model('recipes', 'Feed')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    for subscription in Subscription.objects.iterator():
+        Feed.objects.bulk_create(
+            (Feed(user_id=subscription.user_id, recipe_id=recipe_id)
+             for recipe_id in Recipe.objects.filter(
+                 author_id=subscription.author_id
+             ).values_list('id', flat=True)),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_recipe_image_variants'),
+        ('users', '0002_auto_20240321_1141'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_related', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_related', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Лента подписок',
+                'verbose_name_plural': 'Ленты подписок',
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feed',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='feed_unique_together'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    for model, counter, related_model, related_field in (
+        (Recipe, 'favorites_count', apps.get_model('recipes', 'Favourite'),
+         'recipe'),
+        (Recipe, 'carts_count', apps.get_model('recipes', 'ShoppingCart'),
+         'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', apps.get_model('users', 'Subscription'),
+         'author'),
+    ):
+        model.objects.update(**{counter: Coalesce(Subquery(
+            related_model.objects.filter(**{related_field: OuterRef('pk')})
+            .order_by().values(related_field)
+            .annotate(total=Count('pk')).values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_feed'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX = 'recipe_search_document_gin'
+
+
+def build_search_document(name, text, ingredient_names):
+    # Same as recipes.search.build_search_document at the time.
+    document = '\n'.join((name, text, *ingredient_names))
+    return document.strip().lower().replace('ё', 'е')
+
+
+def fill_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ingredient_names = {}
+    for recipe_id, name in IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredient__name'):
+        ingredient_names.setdefault(recipe_id, []).append(name)
+    for recipe in Recipe.objects.only('name', 'text').iterator():
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_document=build_search_document(
+                recipe.name, recipe.text,
+                sorted(ingredient_names.get(recipe.pk, ()))))
+
+
+def search_index(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return apps.get_model('recipes', 'Recipe'), GinIndex(
+        SearchVector('search_document', config=SEARCH_CONFIG),
+        name=SEARCH_INDEX,
+    )
+
+
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(*search_index(apps))
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(*search_index(apps))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Текст для поиска'),
+        ),
+        migrations.RunPython(fill_search_documents,
+                             migrations.RunPython.noop),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Создан'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменен'),
+        ),
+    ]
@@ -95,6 +95,13 @@ class Recipe(models.Model):
         verbose_name='Ссылка на картинку на сайте',
     )
 
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии картинки',
+    )
+
     text = models.TextField(
         verbose_name='Описание',
     )
@@ -121,6 +128,39 @@ class Recipe(models.Model):
         ],
     )
 
+    search_document = models.TextField(
+        verbose_name='Текст для поиска',
+        blank=True,
+        default='',
+        editable=False,
+    )
+
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+
+    carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+
+    created = models.DateTimeField(
+        verbose_name='Создан',
+        auto_now_add=True,
+    )
+
+    # Also bumped by recipes.signals when tags, ingredients, images or the
+    # author change, so it stands for the whole representation.
+    updated = models.DateTimeField(
+        verbose_name='Изменен',
+        auto_now=True,
+        db_index=True,
+    )
+
     class Meta:
         ordering = ['name']
         verbose_name = 'Рецепт'
@@ -217,3 +257,46 @@ class ShoppingCart(UserRecipeRelation):
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в корзину.'
+
+
+class Feed(UserRecipeRelation):
+    """Recipe published by an author the user is subscribed to."""
+
+    class Meta(UserRecipeRelation.Meta):
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'"{self.recipe}" в ленте {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """Total amount of an ingredient over the recipes in a user's cart."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient.name} - {self.amount}'
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .counters import change_counter, counted_in_bulk
+from .models import Favourite, Recipe, ShoppingCart
+from .shopping_list import change_shopping_lists
+
+User = get_user_model()
+
+RELATION_COUNTERS = {
+    Favourite: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+
+
+def lock_users(user_ids):
+    # Changes of one user's relations and shopping list are serialized on
+    # the user row, so concurrent requests agree on which recipes each of
+    # them changed. Rows are locked in a fixed order to avoid deadlocks.
+    return list(User.objects.select_for_update().filter(
+        pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """Link the recipes to the user, return the ids that were not linked."""
+    lock_users([user.pk])
+    existing = set(model.objects.filter(
+        user=user, recipe_id__in=recipe_ids).values_list(
+        'recipe_id', flat=True))
+    added = [recipe_id for recipe_id in dict.fromkeys(recipe_ids)
+             if recipe_id not in existing]
+    model.objects.bulk_create(
+        (model(user=user, recipe_id=recipe_id) for recipe_id in added),
+        ignore_conflicts=True,
+    )
+    change_counter(Recipe, RELATION_COUNTERS[model], added, 1)
+    if model is ShoppingCart:
+        change_shopping_lists([user.pk], added, 1)
+    if added:
+        # Imported here, the signals module imports this one.
+        from .signals import relations_added
+
+        relations_added.send(sender=model, user_ids=[user.pk])
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Unlink the recipes from the user, return the ids that were linked."""
+    lock_users([user.pk])
+    removed = list(model.objects.filter(
+        user=user, recipe_id__in=recipe_ids).values_list(
+        'recipe_id', flat=True))
+    with counted_in_bulk(model):
+        model.objects.filter(user=user, recipe_id__in=removed).delete()
+    change_counter(Recipe, RELATION_COUNTERS[model], removed, -1)
+    if model is ShoppingCart:
+        change_shopping_lists([user.pk], removed, -1)
+    return removed
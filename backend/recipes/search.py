@@ -0,0 +1,83 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+SEARCH_CONFIG = 'russian'
+
+# Endings stripped by the fallback stemmer, longest first.
+RUSSIAN_ENDINGS = sorted((
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ых', 'их',
+    'ах', 'ях', 'ов', 'ев', 'ом', 'ем', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'а', 'я', 'ы', 'и', 'у', 'ю', 'о',
+    'е', 'ь',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+
+def normalize(value):
+    """Fold case and treat 'ё' as 'е' so that user input matches names."""
+    return value.strip().lower().replace('ё', 'е')
+
+
+def build_search_document(name, text, ingredient_names):
+    return normalize('\n'.join((name, text, *ingredient_names)))
+
+
+def stem(word):
+    for ending in RUSSIAN_ENDINGS:
+        if (word.endswith(ending)
+                and len(word) - len(ending) >= MIN_STEM_LENGTH):
+            return word[:-len(ending)]
+    return word
+
+
+def refresh_search_documents(recipes):
+    """Rebuild the search document of the given recipe queryset."""
+    from .models import IngredientInRecipe, Recipe
+
+    ingredient_names = {}
+    for recipe_id, name in IngredientInRecipe.objects.filter(
+        recipe__in=recipes
+    ).values_list('recipe_id', 'ingredient__name'):
+        ingredient_names.setdefault(recipe_id, []).append(name)
+    for recipe_id, name, text in recipes.values_list('id', 'name', 'text'):
+        Recipe.objects.filter(pk=recipe_id).update(
+            search_document=build_search_document(
+                name, text, sorted(ingredient_names.get(recipe_id, ()))))
+
+
+def search_recipes(queryset, query):
+    """Filter recipes matching `query`, most relevant first.
+
+    PostgreSQL uses Russian full-text search backed by a GIN index on
+    the search document. Other databases fall back to matching crudely
+    stemmed words, ranking recipes whose name (the first line of the
+    document) matches higher.
+    """
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+
+        vector = SearchVector('search_document', config=SEARCH_CONFIG)
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, search_query),
+        ).filter(search_vector=search_query).order_by('-search_rank', '-id')
+
+    stems = [stem(word) for word in re.findall(r'\w+', normalize(query))]
+    if not stems:
+        return queryset.none()
+    for word in stems:
+        queryset = queryset.filter(search_document__contains=word)
+    search_rank = Value(0)
+    for word in stems:
+        search_rank += Case(
+            When(search_document__regex=rf'^[^\n]*{re.escape(word)}',
+                 then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    return queryset.annotate(search_rank=search_rank).order_by(
+        '-search_rank', '-id')
@@ -0,0 +1,64 @@
+from django.db.models import Sum
+
+from .models import IngredientInRecipe, ShoppingListItem
+
+
+def change_shopping_lists(user_ids, recipe_ids, sign):
+    """Add (sign=1) or subtract (sign=-1) the ingredients of the recipes
+    to or from the shopping lists of the users.
+
+    Callers hold the row locks of the users (recipes.relations.lock_users).
+    """
+    totals = dict(IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids).order_by().values_list(
+        'ingredient_id').annotate(total=Sum('amount')))
+    if not totals or not user_ids:
+        return
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=totals)
+    }
+    created, changed, emptied = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, total in totals.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if sign > 0:
+                    created.append(ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=total))
+                continue
+            item.amount += sign * total
+            if item.amount > 0:
+                changed.append(item)
+            else:
+                emptied.append(item.pk)
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.bulk_update(changed, ['amount'])
+    if emptied:
+        ShoppingListItem.objects.filter(pk__in=emptied).delete()
+
+
+def rebuild_shopping_lists(user_ids=None):
+    """Recalculate the shopping lists of the users (of all by default).
+
+    Callers hold the row locks of the users.
+    """
+    items = ShoppingListItem.objects.all()
+    rows = IngredientInRecipe.objects.filter(
+        recipe__shoppingcart_related__isnull=False)
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        rows = IngredientInRecipe.objects.filter(
+            recipe__shoppingcart_related__user_id__in=user_ids)
+    items.delete()
+    totals = rows.order_by().values_list(
+        'recipe__shoppingcart_related__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount'))
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                          amount=amount)
+         for user_id, ingredient_id, amount in totals.iterator()),
+        batch_size=1000,
+    )
@@ -0,0 +1,263 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .counters import COUNTERS, bulk_counted, change_counter
+from .feed import backfill_feed, fan_out_recipe, trim_feed
+from .ingredient_index import ingredient_recipe_index
+from .image_variants import (delete_variant_files, schedule_recipe_image,
+                             variant_names, variants_outdated)
+from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCart, Tag)
+from .relations import lock_users
+from .search import refresh_search_documents
+from .shopping_list import change_shopping_lists, rebuild_shopping_lists
+from users.models import Subscription
+
+# Sent with `recipe_ids` whenever ingredient rows of recipes were added,
+# changed or removed, including bulk operations that skip model signals.
+ingredients_changed = Signal()
+
+# Sent after ingredients were bulk inserted, which skips post_save.
+ingredients_imported = Signal()
+
+# Sent with `recipe_ids` when resized images were stored, which is done
+# with an update() outside of the request.
+image_variants_built = Signal()
+
+# Sent with `user_ids` after favourites or cart rows were bulk inserted,
+# which skips post_save.
+relations_added = Signal()
+
+
+def touch_recipes(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def process_image(sender, instance, **kwargs):
+    if variants_outdated(instance):
+        schedule_recipe_image(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_variants(sender, instance, **kwargs):
+    if 'image_variants' in instance.get_deferred_fields():
+        return
+    names = variant_names(instance.image_variants)
+    if names:
+        transaction.on_commit(lambda: delete_variant_files(names))
+
+
+@receiver(post_save, sender=Recipe)
+def publish_to_feeds(sender, instance, created, **kwargs):
+    if created and instance.author_id:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def fill_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(sender, instance, **kwargs):
+    trim_feed(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        refresh_search_documents(Recipe.objects.filter(pk=instance.pk))
+
+
+class IngredientCascades(threading.local):
+    """Recipes and ingredients being deleted in the current thread.
+
+    Their ingredient rows are deleted one by one in the cascade; the
+    affected recipes are reported once, after the object itself.
+    """
+
+    def __init__(self):
+        self.recipes = set()
+        self.ingredients = {}
+
+
+cascades = IngredientCascades()
+
+
+@receiver(pre_delete, sender=Recipe)
+def start_recipe_cascade(sender, instance, **kwargs):
+    cascades.recipes.add(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def finish_recipe_cascade(sender, instance, **kwargs):
+    cascades.recipes.discard(instance.pk)
+    ingredients_changed.send(sender=sender, recipe_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Ingredient)
+def start_ingredient_cascade(sender, instance, **kwargs):
+    cascades.ingredients[instance.pk] = list(
+        IngredientInRecipe.objects.filter(ingredient=instance).values_list(
+            'recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def finish_ingredient_cascade(sender, instance, **kwargs):
+    recipe_ids = cascades.ingredients.pop(instance.pk, [])
+    if recipe_ids:
+        ingredients_changed.send(sender=sender, recipe_ids=recipe_ids)
+
+
+def counted_fields(sender):
+    """Counters of the rows `sender` rows point to, with the pointing field."""
+    return [(model, counter, related_model._meta.get_field(related_field))
+            for model, counter, related_model, related_field in COUNTERS
+            if related_model is sender]
+
+
+def count_rows(sender, instance, delta):
+    if sender in bulk_counted.models:
+        return
+    for model, counter, field in counted_fields(sender):
+        target_id = getattr(instance, field.attname)
+        # Counters of recipes being deleted need no update.
+        if target_id is not None and not (
+                model is Recipe and target_id in cascades.recipes):
+            change_counter(model, counter, [target_id], delta)
+
+
+@receiver(pre_save, sender=Favourite)
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=Subscription)
+def remember_counted_targets(sender, instance, raw=False, update_fields=None,
+                             **kwargs):
+    # Rows moved to another recipe or author, e.g. in the admin.
+    instance._counted_targets = None
+    fields = [field for _, _, field in counted_fields(sender)]
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not any(
+            field.name in update_fields or field.attname in update_fields
+            for field in fields):
+        return
+    instance._counted_targets = sender.objects.filter(pk=instance.pk).values(
+        *(field.attname for field in fields)).first()
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def count_saved_rows(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        count_rows(sender, instance, 1)
+        return
+    before = getattr(instance, '_counted_targets', None)
+    if not before:
+        return
+    for model, counter, field in counted_fields(sender):
+        old_id = before[field.attname]
+        new_id = getattr(instance, field.attname)
+        if old_id != new_id:
+            if old_id is not None:
+                change_counter(model, counter, [old_id], -1)
+            if new_id is not None:
+                change_counter(model, counter, [new_id], 1)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def count_deleted_rows(sender, instance, **kwargs):
+    count_rows(sender, instance, -1)
+
+
+@receiver([post_save, post_delete], sender=IngredientInRecipe)
+def ingredient_row_changed(sender, instance, **kwargs):
+    if (instance.recipe_id in cascades.recipes
+            or instance.ingredient_id in cascades.ingredients):
+        return
+    ingredients_changed.send(sender=sender, recipe_ids=[instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        ingredients_changed.send(
+            sender=sender,
+            recipe_ids=list(IngredientInRecipe.objects.filter(
+                ingredient=instance).values_list('recipe_id', flat=True)),
+        )
+
+
+@receiver(ingredients_changed)
+def refresh_ingredient_names(sender, recipe_ids, **kwargs):
+    refresh_search_documents(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+@receiver(ingredients_changed)
+def update_ingredient_index(sender, recipe_ids, **kwargs):
+    transaction.on_commit(lambda: ingredient_recipe_index.update(recipe_ids))
+
+
+@receiver(ingredients_changed)
+def refresh_shopping_lists(sender, recipe_ids, **kwargs):
+    # The previous ingredients are gone, so the lists of users with these
+    # recipes in the cart are recalculated instead of adjusted.
+    with transaction.atomic():
+        user_ids = lock_users(ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids).values('user_id'))
+        if user_ids:
+            rebuild_shopping_lists(user_ids)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_shopping_lists(sender, instance, **kwargs):
+    user_ids = lock_users(ShoppingCart.objects.filter(
+        recipe=instance).values('user_id'))
+    change_shopping_lists(user_ids, [instance.pk], -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes([instance.pk])
+    elif action == 'pre_clear':
+        touch_recipes(instance.recipes.values('pk'))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk_set)
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+def touch_tagged_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(instance.recipes.values('pk'))
+
+
+@receiver(ingredients_changed)
+def touch_recipe_ingredients(sender, recipe_ids, **kwargs):
+    touch_recipes(recipe_ids)
+
+
+# Deleted authors are set to NULL with an update(), which skips signals.
+@receiver([post_save, pre_delete], sender=get_user_model())
+def touch_author_recipes(sender, instance, created=False, update_fields=None,
+                         **kwargs):
+    if created or (update_fields is not None
+                   and set(update_fields) <= {'last_login'}):
+        return
+    touch_recipes(instance.recipes.values('pk'))
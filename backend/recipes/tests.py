@@ -0,0 +1,94 @@
+import io
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .image_variants import store_variants, variant_names
+from .models import Ingredient, Recipe
+
+User = get_user_model()
+
+
+class IngredientAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            password='Pa55word!x', first_name='Имя', last_name='Фамилия')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_load_default_ingredients(self):
+        changelist = self.client.get('/admin/recipes/ingredient/')
+        self.assertContains(changelist, '/admin/recipes/ingredient/'
+                                        'load-default/')
+        self.assertFalse(Ingredient.objects.exists())
+        response = self.client.post(
+            '/admin/recipes/ingredient/load-default/', follow=True)
+        self.assertRedirects(response, '/admin/recipes/ingredient/')
+        self.assertContains(response, 'пропущено: 0')
+        self.assertTrue(Ingredient.objects.exists())
+
+    def test_get_not_allowed(self):
+        response = self.client.get('/admin/recipes/ingredient/load-default/')
+        self.assertEqual(response.status_code, 405)
+
+
+def make_image(name):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), 'orange').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class ImageVariantsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root.name)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        cls.media_root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=1,
+            image=make_image('first.png'),
+            author=User.objects.create_user(
+                email='user@example.com', username='user',
+                password='Pa55word!x', first_name='Имя',
+                last_name='Фамилия'))
+
+    def store_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            store_variants(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        names = variant_names(self.recipe.image_variants)
+        self.assertTrue(names)
+        self.assertTrue(all(map(default_storage.exists, names)))
+        return names
+
+    def test_replaced_image(self):
+        old = self.store_variants()
+        self.recipe.image = make_image('second.png')
+        self.recipe.save()
+        new = self.store_variants()
+        self.assertFalse(old & new)
+        self.assertFalse(any(map(default_storage.exists, old)))
+
+    def test_deleted_recipe(self):
+        names = self.store_variants()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertFalse(any(map(default_storage.exists, names)))
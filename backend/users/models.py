@@ -25,6 +25,17 @@ class User(AbstractUser):
         verbose_name='Имя пользователя'
     )
 
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
+
     class Meta:
         ordering = ['username']
         verbose_name = 'Пользователь'
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class SubscriptionsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}', password='Pa55word!x',
+                first_name='Имя', last_name='Фамилия')
+            for number in range(3)
+        ]
+        for number in range(4):
+            Recipe.objects.create(
+                name=f'Рецепт {number}', author=cls.users[0],
+                image='recipes/images/recipe.png', text='Описание',
+                cooking_time=1)
+        Subscription.objects.create(user=cls.users[2], author=cls.users[0])
+        Subscription.objects.create(user=cls.users[2], author=cls.users[1])
+
+    def get_subscriptions(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/users/subscriptions/?limit=6{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_no_subscriptions(self):
+        self.assertEqual(self.get_subscriptions(self.users[0]), [])
+
+    def test_recipes_limit(self):
+        authors = self.get_subscriptions(self.users[2], '&recipes_limit=2')
+        self.assertEqual([author['username'] for author in authors],
+                         ['user0', 'user1'])
+        self.assertEqual([len(author['recipes']) for author in authors],
+                         [2, 0])
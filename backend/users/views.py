@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models import F, Prefetch, Value, prefetch_related_objects
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -9,11 +13,37 @@ from rest_framework.response import Response
 
 from .models import Subscription
 from api.pagination import Pagination
-from api.serializers import UserSerializer, SubscriptionSerializer
+from api.serializers import (UserSerializer, SubscriptionSerializer,
+                             get_recipes_limit)
+from recipes.models import Recipe
 
 User = get_user_model()
 
 
+def limited_recipes(authors, limit):
+    """Return a queryset of the first `limit` recipes of each author.
+
+    Recipes are ranked per author with ROW_NUMBER() in a subquery, so the
+    whole page of authors is covered by a single query.
+    """
+    if not authors:
+        # The SQL of the subquery cannot be built for an empty page.
+        return Recipe.objects.none()
+    ranked = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('name').asc(), F('id').asc()],
+        )
+    ).values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        f'WHERE ranked.row_number <= %s',
+        (*params, limit),
+    ))
+
+
 class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -40,8 +70,14 @@ class UserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        queryset = User.objects.filter(subscribing__user=user).annotate(
+            is_subscribed=Value(True))
         pages = self.paginate_queryset(queryset)
+        prefetch_related_objects(pages, Prefetch(
+            'recipes',
+            queryset=limited_recipes(pages, get_recipes_limit(request)),
+            to_attr='limited_recipes',
+        ))
         serializer = SubscriptionSerializer(pages,
                                             many=True,
                                             context={'request': request})
@@ -52,6 +88,7 @@ class UserViewSet(UserViewSet):
         methods=['post'],
         permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def subscribe(self, request, **kwargs):
         user = request.user
         author_id = self.kwargs.get('id')
@@ -65,6 +102,7 @@ class UserViewSet(UserViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
+    @transaction.atomic
     def unsubscribe(self, request, **kwargs):
         user = request.user
         author_id = self.kwargs.get('id')